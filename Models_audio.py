@@ -3,14 +3,17 @@
 import os
 import re
 import wave
+import struct
 import tempfile
 import random
 import datetime
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
 import azure.cognitiveservices.speech as speechsdk
-from azure.identity import ClientSecretCredential
 
 from utils.config import Config
+from utils.credentials import get_credential
 from utils.logging import default_logger
 
 
@@ -22,11 +25,7 @@ class AudioProcessor:
         if not Config.validate_azure_speech_config():
             raise RuntimeError("Missing AAD Speech env vars (TENANT_ID, CLIENT_ID, CLIENT_SECRET, SPEECH_REGION)")
         
-        self.cred = ClientSecretCredential(
-            tenant_id=Config.TENANT_ID,
-            client_id=Config.CLIENT_ID,
-            client_secret=Config.CLIENT_SECRET
-        )
+        self.cred = get_credential(Config.TENANT_ID, Config.CLIENT_ID, Config.CLIENT_SECRET)
         self.temp_files = []
     
     def get_auth_token(self) -> str:
@@ -226,27 +225,17 @@ class AudioProcessor:
             RuntimeError: If concatenation fails
         """
         fd, tmp_path = tempfile.mkstemp(prefix="final_", suffix=".wav")
-        os.close(fd)
         
         try:
-            with wave.open(tmp_path, "wb") as output_wav:
-                output_wav.setnchannels(1)
-                output_wav.setsampwidth(2)
-                output_wav.setframerate(sample_rate)
-                
-                for segment_path in segments:
-                    try:
-                        with wave.open(segment_path, "rb") as segment_wav:
-                            # Verify format compatibility
-                            if (segment_wav.getframerate(), segment_wav.getnchannels(), 
-                                segment_wav.getsampwidth()) != (sample_rate, 1, 2):
-                                raise RuntimeError(f"Segment format mismatch: {segment_path}")
-                            
-                            # Copy audio data
-                            output_wav.writeframes(segment_wav.readframes(segment_wav.getnframes()))
-                    except Exception as e:
-                        default_logger.error(f"Failed to process segment {segment_path}: {e}")
-                        raise
+            if hasattr(os, "pwrite"):
+                try:
+                    self._write_segments_parallel(fd, segments, sample_rate)
+                finally:
+                    os.close(fd)
+            else:
+                # No positional I/O (Windows): copy serially through wave
+                os.close(fd)
+                self._write_segments_serial(tmp_path, segments, sample_rate)
             
             # Move to final location
             try:
@@ -269,6 +258,93 @@ class AudioProcessor:
                 pass
             raise RuntimeError(f"Audio concatenation failed: {e}")
     
+    def _segment_layout(self, segments: list[str], sample_rate: int) -> list[Tuple[str, int, int]]:
+        """Validate segment formats and locate each one's PCM data as (path, offset, size)."""
+        layout = []
+        for segment_path in segments:
+            try:
+                with open(segment_path, "rb") as f, wave.open(f, "rb") as segment_wav:
+                    # Verify format compatibility
+                    if (segment_wav.getframerate(), segment_wav.getnchannels(), 
+                        segment_wav.getsampwidth()) != (sample_rate, 1, 2):
+                        raise RuntimeError(f"Segment format mismatch: {segment_path}")
+                    
+                    # wave stops reading right after the data chunk header
+                    layout.append((segment_path, f.tell(), segment_wav.getnframes() * 2))
+            except Exception as e:
+                default_logger.error(f"Failed to process segment {segment_path}: {e}")
+                raise
+        return layout
+    
+    @staticmethod
+    def _copy_range(src_path: str, dst_fd: int, src_offset: int, size: int, dst_offset: int):
+        """Copy bytes between files at explicit offsets, in-kernel where supported."""
+        use_copy_file_range = hasattr(os, "copy_file_range")
+        with open(src_path, "rb") as src:
+            src_fd = src.fileno()
+            while size:
+                if use_copy_file_range:
+                    try:
+                        copied = os.copy_file_range(src_fd, dst_fd, size, src_offset, dst_offset)
+                    except OSError:
+                        # Unsupported by this kernel or filesystem pair
+                        use_copy_file_range = False
+                        continue
+                else:
+                    data = os.pread(src_fd, min(size, 1 << 20), src_offset)
+                    copied = os.pwrite(dst_fd, data, dst_offset) if data else 0
+                if not copied:
+                    raise RuntimeError(f"Segment truncated: {src_path}")
+                src_offset += copied
+                dst_offset += copied
+                size -= copied
+    
+    def _write_segments_parallel(self, fd: int, segments: list[str], sample_rate: int):
+        """Write the WAV header, then copy every segment body to its precomputed offset."""
+        layout = self._segment_layout(segments, sample_rate)
+        data_size = sum(size for _, _, size in layout)
+        
+        if hasattr(os, "posix_fallocate") and data_size:
+            try:
+                os.posix_fallocate(fd, 0, 44 + data_size)
+            except OSError:
+                pass
+        
+        header = struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + data_size, b"WAVE",
+            b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+            b"data", data_size
+        )
+        os.pwrite(fd, header, 0)
+        
+        paths, src_offsets, sizes = zip(*layout) if layout else ((), (), ())
+        dst_offsets = itertools.accumulate(sizes, initial=len(header))
+        with ThreadPoolExecutor(max_workers=min(8, len(layout) or 1)) as pool:
+            # list() surfaces the first copy error
+            list(pool.map(self._copy_range, paths, itertools.repeat(fd), src_offsets, sizes, dst_offsets))
+    
+    def _write_segments_serial(self, output_path: str, segments: list[str], sample_rate: int):
+        """Concatenate segments through the wave module."""
+        with wave.open(output_path, "wb") as output_wav:
+            output_wav.setnchannels(1)
+            output_wav.setsampwidth(2)
+            output_wav.setframerate(sample_rate)
+            
+            for segment_path in segments:
+                try:
+                    with wave.open(segment_path, "rb") as segment_wav:
+                        # Verify format compatibility
+                        if (segment_wav.getframerate(), segment_wav.getnchannels(), 
+                            segment_wav.getsampwidth()) != (sample_rate, 1, 2):
+                            raise RuntimeError(f"Segment format mismatch: {segment_path}")
+                        
+                        # Copy audio data
+                        output_wav.writeframes(segment_wav.readframes(segment_wav.getnframes()))
+                except Exception as e:
+                    default_logger.error(f"Failed to process segment {segment_path}: {e}")
+                    raise
+    
     def cleanup_temp_files(self):
         """Clean up temporary audio files."""
         for temp_file in self.temp_files:
@@ -6,6 +6,8 @@ import sys
 import json
 import random
 import asyncio
+import functools
+import contextvars
 from pathlib import Path
 from typing import Tuple, Dict, List, Any, Optional
 from dataclasses import dataclass, field
@@ -29,6 +31,28 @@ class PodcastContext:
     content: str
     metadata: Dict[str, Any] = field(default_factory=dict)
     
+    @functools.cached_property
+    def summary(self) -> str:
+        """First 500 characters of the content, for prompts that need a short context."""
+        return self.content[:500] + "..." if len(self.content) > 500 else self.content
+    
+    @staticmethod
+    def paths_for(file_choice: str) -> Tuple[str, ...]:
+        """Context files read for a file choice."""
+        return ("data.json", "metric_data.json") if file_choice == "both" else (file_choice,)
+    
+    @classmethod
+    def load_cached(cls, file_choice: str) -> 'PodcastContext':
+        """Load context, reusing the previous result while the files are unchanged.
+        
+        The returned instance is shared between callers and must not be mutated.
+        """
+        mtime_key = tuple(
+            os.stat(path).st_mtime_ns if os.path.exists(path) else None
+            for path in cls.paths_for(file_choice)
+        )
+        return _load_context_cached(cls, file_choice, mtime_key)
+    
     @classmethod
     def load_from_files(cls, file_choice: str) -> 'PodcastContext':
         """Load context from JSON files."""
@@ -47,10 +71,8 @@ class PodcastContext:
                     return ""
             return ""
         
-        if file_choice == "both":
-            context_text += add_file("data.json") + add_file("metric_data.json")
-        else:
-            context_text += add_file(file_choice)
+        for path in cls.paths_for(file_choice):
+            context_text += add_file(path)
         
         if not context_text:
             raise RuntimeError("No data found (need data.json and/or metric_data.json).")
@@ -58,6 +80,12 @@ class PodcastContext:
         return cls(content=context_text, metadata=meta)
 
 
+@functools.lru_cache(maxsize=8)
+def _load_context_cached(cls, file_choice: str, mtime_key: Tuple) -> PodcastContext:
+    """Cached loader behind PodcastContext.load_cached; mtime_key invalidates on file changes."""
+    return cls.load_from_files(file_choice)
+
+
 class LLMService:
     """Service for interacting with Azure OpenAI using LLM Factory."""
     
@@ -77,7 +105,6 @@ class LLMService:
             scope=self.config.scope
         )
         self.factory = LLMFactory(self.config, self.token_manager)
-        self.llm_instance = None
         self.LangChainException = LangChainException
     
     def _soften_text(self, text: str) -> str:
@@ -112,8 +139,9 @@ class LLMService:
     
     async def _generate_async(self, system: str, user: str, max_tokens: int, temperature: float) -> str:
         """Asynchronous LLM generation using LLM Factory."""
-        if not self.llm_instance:
-            self.llm_instance = await self.factory.create_llm()
+        # The factory caches one client per event loop; holding on to it here
+        # would reuse a previous loop's connections from another loop
+        llm = await self.factory.create_llm()
         
         from langchain_core.messages import SystemMessage, HumanMessage
         
@@ -123,7 +151,7 @@ class LLMService:
         ]
         
         # Configure the LLM with the desired parameters
-        configured_llm = self.llm_instance.bind(
+        configured_llm = llm.bind(
             max_tokens=max_tokens,
             temperature=temperature
         )
@@ -159,16 +187,46 @@ class LLMService:
         return await self.generate_safe(system, user, max_tokens, temperature)
 
 
+# Openers used so far in the current podcast run; see ConversationDynamics.start_run
+_run_openings: contextvars.ContextVar[Optional[Dict[str, str]]] = contextvars.ContextVar(
+    "run_openings", default=None
+)
+
+
 class ConversationDynamics:
     """Handles conversation dynamics and humanization."""
     
     def __init__(self):
-        self.last_openings: Dict[str, str] = {}
+        self._last_openings: Dict[str, str] = {}
+    
+    @staticmethod
+    def start_run() -> contextvars.Token:
+        """Give the calling context its own opener history.
+        
+        Node services are shared by every orchestrator in the process, so a
+        run's history lives in a context variable rather than on the instance.
+        Pass the returned token to end_run when the run finishes.
+        """
+        return _run_openings.set({})
+    
+    @staticmethod
+    def end_run(token: contextvars.Token):
+        """Restore the opener history that was active before start_run."""
+        _run_openings.reset(token)
+    
+    @property
+    def last_openings(self) -> Dict[str, str]:
+        """Last opener per role for the current run, or for this instance outside a run."""
+        run_openings = _run_openings.get()
+        return self._last_openings if run_openings is None else run_openings
     
     def strip_forbidden_words(self, text: str, role: str) -> str:
         """Remove forbidden opening words for the given role."""
         low_text = text.strip().lower()
-        for word in sorted(Config.FORBIDDEN[role], key=lambda x: -len(x)):
+        candidates = Config.FORBIDDEN_FIRST[role].get(low_text.split(" ", 1)[0])
+        if not candidates:
+            return text
+        for word in candidates:
             if low_text.startswith(word + " ") or low_text == word:
                 return text[len(word):].lstrip(" ,.-–—")
         return text
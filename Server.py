@@ -206,7 +206,7 @@ async def generate_podcast_background(
         
         # Load context
         from .models.podcast import PodcastContext
-        context = PodcastContext.load_from_files(request.file_choice)
+        context = PodcastContext.load_cached(request.file_choice)
         
         # Infer topic if not provided
         topic = request.topic or podcast_engine.infer_topic_from_context(context.content)
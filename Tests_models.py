@@ -1,10 +1,21 @@
 """Test suite for UAP Podcast models."""
 
+import os
+import wave
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 
 from src.uap_podcast.models.podcast import PodcastEngine, PodcastContext, LLMService, ConversationDynamics
 from src.uap_podcast.models.audio import AudioProcessor
+from src.uap_podcast.utils.config import _index_by_first_word
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _stub_sdks():
+    """Stub the Azure SDK entry points once for this module's tests."""
+    with patch('src.uap_podcast.models.podcast.AzureOpenAI'), \
+         patch('src.uap_podcast.models.audio.get_credential'):
+        yield
 
 
 class TestPodcastContext:
@@ -16,6 +27,20 @@ class TestPodcastContext:
         assert context.content == "test content"
         assert context.metadata["files"] == ["test.json"]
 
+    def test_load_cached(self, tmp_path, monkeypatch):
+        """Test cached loading reuses the context until the file changes."""
+        monkeypatch.chdir(tmp_path)
+        data_file = tmp_path / "data.json"
+        data_file.write_text('{"a": 1}')
+
+        first = PodcastContext.load_cached("data.json")
+        assert PodcastContext.load_cached("data.json") is first
+
+        data_file.write_text('{"a": 2}')
+        os.utime(data_file, ns=(0, data_file.stat().st_mtime_ns + 1))
+        assert PodcastContext.load_cached("data.json") is not first
+        assert '"a": 2' in PodcastContext.load_cached("data.json").content
+
 
 class TestLLMService:
     """Test cases for LLM Service."""
@@ -28,9 +53,7 @@ class TestLLMService:
         mock_config.AZURE_OPENAI_ENDPOINT = "test_endpoint"
         mock_config.OPENAI_API_VERSION = "test_version"
         
-        with patch('src.uap_podcast.models.podcast.AzureOpenAI'):
-            service = LLMService()
-            assert service is not None
+        LLMService()
     
     @patch('src.uap_podcast.models.podcast.Config')
     def test_init_with_invalid_config(self, mock_config):
@@ -43,23 +66,21 @@ class TestLLMService:
     def test_soften_text(self):
         """Test text softening for content policy compliance."""
         with patch('src.uap_podcast.models.podcast.Config'):
-            with patch('src.uap_podcast.models.podcast.AzureOpenAI'):
-                service = LLMService()
-                
-                result = service._soften_text("Do not ignore this sole factual source")
-                assert "please avoid" in result
-                assert "primary context" in result
+            service = LLMService()
+            
+            result = service._soften_text("Do not ignore this sole factual source")
+            assert "please avoid" in result
+            assert "primary context" in result
     
     def test_validate_response(self):
         """Test response validation."""
         with patch('src.uap_podcast.models.podcast.Config'):
-            with patch('src.uap_podcast.models.podcast.AzureOpenAI'):
-                service = LLMService()
-                
-                assert service._validate_response("This is a good response.") is True
-                assert service._validate_response("") is False
-                assert service._validate_response("short") is False
-                assert service._validate_response("TOO MANY CAPITALS!!!") is False
+            service = LLMService()
+            
+            assert service._validate_response("This is a good response.") is True
+            assert service._validate_response("") is False
+            assert service._validate_response("short") is False
+            assert service._validate_response("TOO MANY CAPITALS!!!") is False
 
 
 class TestConversationDynamics:
@@ -69,20 +90,41 @@ class TestConversationDynamics:
         """Test conversation dynamics initialization."""
         dynamics = ConversationDynamics()
         assert dynamics.last_openings == {}
-    
+
+    def test_run_scoped_openings(self):
+        """Test each run gets its own opener history on shared dynamics."""
+        dynamics = ConversationDynamics()
+        dynamics.last_openings["RECO"] = "Given that"
+
+        token = ConversationDynamics.start_run()
+        assert dynamics.last_openings == {}
+        dynamics.last_openings["RECO"] = "Looking at this"
+        ConversationDynamics.end_run(token)
+
+        assert dynamics.last_openings == {"RECO": "Given that"}
+
+    @pytest.mark.parametrize("text, expected", [
+        ("absolutely this is good", "this is good"),
+        ("You know this is good", "this is good"),
+        ("You know what this is good", "this is good"),
+        ("You can see the trend", "You can see the trend"),
+        ("The trend is up", "The trend is up"),
+    ])
     @patch('src.uap_podcast.models.podcast.Config')
-    def test_strip_forbidden_words(self, mock_config):
-        """Test forbidden word stripping."""
-        mock_config.FORBIDDEN = {"RECO": {"absolutely", "well"}}
+    def test_strip_forbidden_words(self, mock_config, text, expected):
+        """Test forbidden word stripping, including multi-word phrases matched longest first."""
+        forbidden = {"absolutely", "well", "you know", "you know what"}
+        mock_config.FORBIDDEN = {"RECO": forbidden}
+        mock_config.FORBIDDEN_FIRST = {"RECO": _index_by_first_word(forbidden)}
         
         dynamics = ConversationDynamics()
-        result = dynamics.strip_forbidden_words("absolutely this is good", "RECO")
-        assert not result.startswith("absolutely")
+        assert dynamics.strip_forbidden_words(text, "RECO") == expected
     
     @patch('src.uap_podcast.models.podcast.Config')
     def test_vary_opening(self, mock_config):
         """Test opening variation."""
         mock_config.FORBIDDEN = {"RECO": {"absolutely"}}
+        mock_config.FORBIDDEN_FIRST = {"RECO": _index_by_first_word({"absolutely"})}
         mock_config.OPENERS = {"RECO": ["Given that", "Looking at this"]}
         
         dynamics = ConversationDynamics()
@@ -93,15 +135,23 @@ class TestConversationDynamics:
 class TestPodcastEngine:
     """Test cases for PodcastEngine."""
     
+    @pytest.mark.parametrize("attr, service", [
+        ("llm", "LLMService"),
+        ("audio", "AudioProcessor"),
+        ("dynamics", "ConversationDynamics"),
+    ])
     @patch('src.uap_podcast.models.podcast.LLMService')
     @patch('src.uap_podcast.models.podcast.AudioProcessor')
     @patch('src.uap_podcast.models.podcast.ConversationDynamics')
-    def test_init(self, mock_dynamics, mock_audio, mock_llm):
-        """Test podcast engine initialization."""
+    def test_engine_wiring(self, mock_dynamics, mock_audio, mock_llm, attr, service):
+        """Test podcast engine wires each service instance."""
+        services = {
+            "LLMService": mock_llm,
+            "AudioProcessor": mock_audio,
+            "ConversationDynamics": mock_dynamics,
+        }
         engine = PodcastEngine()
-        assert engine.llm is not None
-        assert engine.audio is not None
-        assert engine.dynamics is not None
+        assert getattr(engine, attr) is services[service].return_value
     
     @patch('src.uap_podcast.models.podcast.LLMService')
     @patch('src.uap_podcast.models.podcast.AudioProcessor') 
@@ -130,9 +180,8 @@ class TestAudioProcessor:
         mock_config.CLIENT_SECRET = "test_secret"
         mock_config.COG_SCOPE = "test_scope"
         
-        with patch('src.uap_podcast.models.audio.ClientSecretCredential'):
-            processor = AudioProcessor()
-            assert processor.temp_files == []
+        processor = AudioProcessor()
+        assert processor.temp_files == []
     
     @patch('src.uap_podcast.models.audio.Config')
     def test_init_with_invalid_config(self, mock_config):
@@ -150,10 +199,9 @@ class TestAudioProcessor:
         mock_config.CLIENT_ID = "test"
         mock_config.CLIENT_SECRET = "test"
         
-        with patch('src.uap_podcast.models.audio.ClientSecretCredential'):
-            processor = AudioProcessor()
-            result = processor._jitter("+5%", 2)
-            assert "%" in result
+        processor = AudioProcessor()
+        result = processor._jitter("+5%", 2)
+        assert "%" in result
     
     @patch('src.uap_podcast.models.audio.Config')
     def test_emphasize_numbers(self, mock_config):
@@ -163,7 +211,46 @@ class TestAudioProcessor:
         mock_config.CLIENT_ID = "test"
         mock_config.CLIENT_SECRET = "test"
         
-        with patch('src.uap_podcast.models.audio.ClientSecretCredential'):
-            processor = AudioProcessor()
-            result = processor._emphasize_numbers("The value is 1500 units")
-            assert "<emphasis" in result
+        processor = AudioProcessor()
+        result = processor._emphasize_numbers("The value is 1500 units")
+        assert "<emphasis" in result
+    
+    @staticmethod
+    def _write_wav(path, frames: bytes, sample_rate: int = 24000) -> str:
+        with wave.open(str(path), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(frames)
+        return str(path)
+    
+    @patch('src.uap_podcast.models.audio.Config')
+    def test_concatenate_matches_serial(self, mock_config, tmp_path):
+        """Test positional concatenation produces the same file as the wave path."""
+        mock_config.validate_azure_speech_config.return_value = True
+        
+        processor = AudioProcessor()
+        segments = [
+            self._write_wav(tmp_path / "a.wav", b"\x01\x00" * 300),
+            self._write_wav(tmp_path / "empty.wav", b""),
+            self._write_wav(tmp_path / "b.wav", bytes(range(256)) * 4),
+        ]
+        output = processor.concatenate_audio_segments(segments, str(tmp_path / "out.wav"))
+        processor._write_segments_serial(str(tmp_path / "serial.wav"), segments, 24000)
+        
+        assert (tmp_path / "out.wav").read_bytes() == (tmp_path / "serial.wav").read_bytes()
+        assert processor.get_wav_duration(output) == pytest.approx(812 / 24000)
+    
+    @patch('src.uap_podcast.models.audio.Config')
+    def test_concatenate_format_mismatch(self, mock_config, tmp_path):
+        """Test a segment with a different sample rate is rejected."""
+        mock_config.validate_azure_speech_config.return_value = True
+        
+        processor = AudioProcessor()
+        segments = [
+            self._write_wav(tmp_path / "a.wav", b"\x01\x00" * 300),
+            self._write_wav(tmp_path / "b.wav", b"\x01\x00" * 300, sample_rate=16000),
+        ]
+        with pytest.raises(RuntimeError, match="format mismatch"):
+            processor.concatenate_audio_segments(segments, str(tmp_path / "out.wav"))
+        assert not (tmp_path / "out.wav").exists()
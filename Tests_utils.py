@@ -1,12 +1,17 @@
 """Test suite for UAP Podcast utilities."""
 
 import pytest
+import asyncio
+import json
 import tempfile
 import os
-from unittest.mock import patch, Mock
+import time
+from unittest.mock import patch, Mock, AsyncMock
 
 from src.uap_podcast.utils.config import Config
 from src.uap_podcast.utils.logging import setup_logger, get_session_logger
+from src.uap_podcast.utils.state_monitor import StateMonitor
+from src.uap_podcast.utils.token_manager import TokenManager
 
 
 class TestConfig:
@@ -20,37 +25,32 @@ class TestConfig:
         assert hasattr(Config, 'VOICE_RECO')
         assert hasattr(Config, 'VOICE_STAT')
     
-    def test_voice_plan_structure(self):
-        """Test voice plan configuration structure."""
-        assert isinstance(Config.VOICE_PLAN, dict)
-        assert "NEXUS" in Config.VOICE_PLAN
-        assert "RECO" in Config.VOICE_PLAN
-        assert "STAT" in Config.VOICE_PLAN
-        
-        for agent, plan in Config.VOICE_PLAN.items():
-            assert "style" in plan
-            assert "base_pitch" in plan
-            assert "base_rate" in plan
-    
-    def test_forbidden_words_structure(self):
-        """Test forbidden words configuration."""
-        assert isinstance(Config.FORBIDDEN, dict)
-        assert "RECO" in Config.FORBIDDEN
-        assert "STAT" in Config.FORBIDDEN
-        
-        for agent, words in Config.FORBIDDEN.items():
-            assert isinstance(words, set)
-            assert len(words) > 0
-    
-    def test_openers_structure(self):
-        """Test openers configuration."""
-        assert isinstance(Config.OPENERS, dict)
-        assert "RECO" in Config.OPENERS
-        assert "STAT" in Config.OPENERS
-        
-        for agent, openers in Config.OPENERS.items():
-            assert isinstance(openers, list)
-            assert len(openers) > 0
+    @pytest.mark.parametrize("agent", ["NEXUS", "RECO", "STAT"])
+    def test_voice_plan(self, agent):
+        """Test voice plan structure, percentages and voice name for each agent."""
+        plan = Config.VOICE_PLAN[agent]
+        assert {"style", "base_pitch", "base_rate"} <= plan.keys()
+        for key in ("base_pitch", "base_rate"):
+            assert plan[key].endswith("%")
+            assert plan[key][0] in "+-"
+        
+        voice = getattr(Config, f"VOICE_{agent}")
+        assert voice.startswith("en-US-")
+        assert voice.endswith("Neural")
+    
+    @pytest.mark.parametrize("agent", ["RECO", "STAT"])
+    def test_forbidden_words(self, agent):
+        """Test forbidden words configuration for each agent."""
+        words = Config.FORBIDDEN[agent]
+        assert isinstance(words, (set, frozenset))
+        assert len(words) > 0
+    
+    @pytest.mark.parametrize("agent", ["RECO", "STAT"])
+    def test_openers(self, agent):
+        """Test openers configuration for each agent."""
+        openers = Config.OPENERS[agent]
+        assert isinstance(openers, (list, tuple))
+        assert len(openers) > 0
     
     def test_intro_outro_content(self):
         """Test intro and outro content exists."""
@@ -158,33 +158,195 @@ class TestConfigConstants:
     
     def test_system_prompts_exist(self):
         """Test that system prompts are defined."""
-        # These should be imported from models if available
-        try:
-            from src.uap_podcast.models.podcast import SYSTEM_RECO, SYSTEM_STAT, SYSTEM_NEXUS
-            assert len(SYSTEM_RECO) > 100
-            assert len(SYSTEM_STAT) > 100 
-            assert len(SYSTEM_NEXUS) > 50
-        except ImportError:
-            # If not available due to import issues, that's OK for this test
-            pass
-    
-    def test_voice_names_format(self):
-        """Test voice names follow expected format."""
-        assert Config.VOICE_NEXUS.startswith("en-US-")
-        assert Config.VOICE_RECO.startswith("en-US-")
-        assert Config.VOICE_STAT.startswith("en-US-")
-        
-        assert Config.VOICE_NEXUS.endswith("Neural")
-        assert Config.VOICE_RECO.endswith("Neural") 
-        assert Config.VOICE_STAT.endswith("Neural")
-    
-    def test_voice_plan_percentages(self):
-        """Test voice plan percentages are properly formatted."""
-        for agent, plan in Config.VOICE_PLAN.items():
-            pitch = plan["base_pitch"]
-            rate = plan["base_rate"]
+        from src.uap_podcast.models import podcast as podcast_module
+        
+        assert len(podcast_module.SYSTEM_RECO) > 100
+        assert len(podcast_module.SYSTEM_STAT) > 100
+        assert len(podcast_module.SYSTEM_NEXUS) > 50
+
+
+class TestDownmixAndResample:
+    """Test cases for STT input conversion."""
+    
+    @pytest.fixture
+    def convert(self):
+        """The Numba-compiled conversion entry point."""
+        from src.uap_podcast.utils.audio import downmix_and_resample
+        return downmix_and_resample
+    
+    def test_mono_passthrough(self, convert):
+        """Test mono input at the target rate is returned unchanged."""
+        import numpy as np
+        samples = np.array([0, 1000, -1000, 32767, -32768], dtype=np.int16)
+        result = convert(samples, 1, 16000, 16000)
+        assert result.dtype == np.int16
+        assert result.tolist() == samples.tolist()
+    
+    def test_stereo_averaging(self, convert):
+        """Test interleaved stereo frames are averaged to mono."""
+        import numpy as np
+        samples = np.array([100, 300, -100, -300, 0, 50], dtype=np.int16)
+        assert convert(samples, 2, 16000, 16000).tolist() == [200, -200, 25]
+    
+    def test_resample_length(self, convert):
+        """Test 48 kHz input is resampled to a third of the samples at 16 kHz."""
+        import numpy as np
+        samples = np.zeros(4800, dtype=np.int16)
+        assert len(convert(samples, 1, 48000, 16000)) == 1600
+    
+    def test_int16_clipping(self, convert):
+        """Test anti-alias filter overshoot on a full-scale square wave saturates instead of wrapping."""
+        import numpy as np
+        # 48 kHz square wave with 96-sample half periods; the low-pass rings past full scale at each edge
+        samples = np.where((np.arange(4800) // 96) % 2 == 0, 32767, -32768).astype(np.int16)
+        result = convert(samples, 1, 48000, 16000)
+        assert result.dtype == np.int16
+        assert result.max() == 32767
+        assert result.min() == -32768
+        expected_sign = np.where((np.arange(len(result)) * 3 // 96) % 2 == 0, 1, -1)
+        assert (np.sign(result) == expected_sign).all()
+    
+    def test_downsampling_removes_aliases(self, convert):
+        """Test content above the output Nyquist frequency is filtered rather than folded down."""
+        import numpy as np
+        t = np.arange(48000) / 48000
+        tone = (10000 * np.sin(2 * np.pi * 12000 * t)).astype(np.int16)
+        result = convert(tone, 1, 48000, 16000).astype(float)
+        assert np.sqrt(np.mean(result ** 2)) < 100
+
+
+class TestStateMonitor:
+    """Test cases for StateMonitor."""
+    
+    @pytest.fixture
+    def monitor(self, tmp_path):
+        """A monitor writing into a temporary directory."""
+        monitor = StateMonitor(str(tmp_path / "state.json"))
+        yield monitor
+        monitor.close()
+    
+    def _record_run(self, monitor):
+        monitor.start_execution("session_1", {"current_turn": 0})
+        monitor.record_node_execution(
+            "nexus_intro", {"current_turn": 0},
+            {"current_turn": 1, "conversation_history": ["hi"]}, duration_ns=2_000_000
+        )
+        monitor.record_node_execution("reco_turn", None, {"current_turn": 2}, duration_ns=3_000_000)
+        monitor.record_error("stat_turn", ValueError("boom"), {"current_turn": 2})
+        monitor.end_execution({"current_turn": 2, "max_turns": 2})
+    
+    def test_sync_execution(self, monitor):
+        """Test snapshot, JSONL log and agent stats after a full run outside an event loop."""
+        self._record_run(monitor)
+        
+        snapshot = json.loads(monitor.output_file.read_bytes())
+        history = snapshot["state_history"]
+        assert [record["node_name"] for record in history] == ["nexus_intro", "reco_turn", "stat_turn"]
+        assert "input_state" in history[0]
+        assert "input_state" not in history[1]
+        assert history[2]["error_message"] == "boom"
+        assert snapshot["execution_metadata"]["node_count"] == 2
+        assert snapshot["execution_metadata"]["error_count"] == 1
+        assert snapshot["current_state"] == {"current_turn": 2, "max_turns": 2}
+        
+        lines = monitor.log_file.read_bytes().splitlines()
+        assert [json.loads(line) for line in lines] == history
+        
+        summary = monitor.get_execution_summary()
+        assert summary["status"] == "completed"
+        assert summary["agent_stats"] == {
+            "NEXUS": {"count": 1, "total_duration": 0.002},
+            "RECO": {"count": 1, "total_duration": 0.003},
+        }
+    
+    def test_log_truncated_per_execution(self, monitor):
+        """Test each execution starts a fresh JSONL log."""
+        self._record_run(monitor)
+        monitor.start_execution("session_2", {"current_turn": 0})
+        monitor.record_node_execution("nexus_intro", None, {"current_turn": 1})
+        monitor.end_execution({"current_turn": 1})
+        
+        lines = monitor.log_file.read_bytes().splitlines()
+        assert [json.loads(line)["node_name"] for line in lines] == ["nexus_intro"]
+    
+    @pytest.mark.asyncio
+    async def test_flusher_coalesces_writes(self, monitor):
+        """Test records arriving within one flush interval share one snapshot write."""
+        monitor.start_execution("session_1", {"current_turn": 0})
+        
+        with patch.object(monitor, "_write_payload", wraps=monitor._write_payload) as write:
+            for turn in range(20):
+                monitor.record_node_execution("reco_turn", None, {"current_turn": turn})
+            await asyncio.sleep(StateMonitor.FLUSH_INTERVAL * 3)
+            assert write.call_count == 1
             
-            assert pitch.endswith("%")
-            assert rate.endswith("%")
-            assert pitch.startswith(("+", "-"))
-            assert rate.startswith(("+", "-"))
+            for turn in range(20):
+                monitor.record_node_execution("stat_turn", None, {"current_turn": turn})
+            await asyncio.sleep(StateMonitor.FLUSH_INTERVAL * 3)
+            assert write.call_count == 2
+            
+            monitor.end_execution({"current_turn": 20})
+            assert write.call_count == 3
+        
+        snapshot = json.loads(monitor.output_file.read_bytes())
+        assert len(snapshot["state_history"]) == 40
+        assert len(monitor.log_file.read_bytes().splitlines()) == 40
+
+
+class TestTokenManager:
+    """Test cases for TokenManager."""
+    
+    @pytest.fixture(autouse=True)
+    def _clean_env(self, monkeypatch):
+        """Start without a cached token; values set by the manager are undone afterwards."""
+        for key in ("AZURE_OPENAI_API_KEY", "AZURE_OPENAI_TOKEN_EXPIRY", "TOKEN_PERSIST_TO_ENV"):
+            monkeypatch.delenv(key, raising=False)
+    
+    @staticmethod
+    def _manager(tmp_path):
+        """A manager whose auth client returns one token after a short delay."""
+        manager = TokenManager("https://auth.test/token", "client_credentials", "scope",
+                               env_path=str(tmp_path / ".env"))
+        response = Mock()
+        response.json.return_value = {"access_token": "fresh_token", "expires_in": 3600}
+        
+        async def post(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return response
+        
+        client = Mock()
+        client.post = AsyncMock(side_effect=post)
+        manager._client = Mock(return_value=client)
+        return manager, client.post
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_refresh(self, tmp_path):
+        """Test concurrent callers without a valid token trigger a single POST."""
+        manager, post = self._manager(tmp_path)
+        
+        tokens = await asyncio.gather(*(manager.generate_token() for _ in range(10)))
+        assert tokens == ["fresh_token"] * 10
+        assert post.await_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_cached_token_skips_refresh(self, tmp_path, monkeypatch):
+        """Test a token from the environment that is not near expiry is reused."""
+        monkeypatch.setenv("AZURE_OPENAI_API_KEY", "cached_token")
+        monkeypatch.setenv("AZURE_OPENAI_TOKEN_EXPIRY", str(time.time() + 3600))
+        manager, post = self._manager(tmp_path)
+        
+        assert await manager.generate_token() == "cached_token"
+        post.assert_not_awaited()
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("persist, writes_env_file", [(None, False), ("1", True)])
+    async def test_env_file_persistence_opt_in(self, tmp_path, monkeypatch, persist, writes_env_file):
+        """Test the .env file is only rewritten when TOKEN_PERSIST_TO_ENV=1."""
+        if persist is not None:
+            monkeypatch.setenv("TOKEN_PERSIST_TO_ENV", persist)
+        manager, _ = self._manager(tmp_path)
+        
+        with patch('src.uap_podcast.utils.token_manager.set_key') as set_key:
+            assert await manager.generate_token() == "fresh_token"
+        assert set_key.called is writes_env_file
+        assert os.environ["AZURE_OPENAI_API_KEY"] == "fresh_token"
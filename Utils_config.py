@@ -1,12 +1,22 @@
 """Configuration module for UAP Podcast application."""
 
 import os
-from typing import Dict, Any
+import textwrap
+from typing import Dict, Any, Iterable, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+
+def _index_by_first_word(phrases: Iterable[str]) -> Dict[str, Tuple[str, ...]]:
+    """Group phrases by their lowercased first word, longest phrase first."""
+    index: Dict[str, list] = {}
+    for phrase in sorted(phrases, key=lambda x: -len(x)):
+        index.setdefault(phrase.split()[0].lower(), []).append(phrase)
+    return {first: tuple(group) for first, group in index.items()}
+
+
 class Config:
     """Configuration class for UAP Podcast application."""
     
@@ -44,30 +54,40 @@ class Config:
         "STAT": {"style": "serious", "base_pitch": "-1%", "base_rate": "-4%"},
     }
     
+    # Voice name + plan per role, built once for get_voice_config
+    _VOICE_CONFIGS = {
+        "NEXUS": {"voice": VOICE_NEXUS, "plan": VOICE_PLAN["NEXUS"]},
+        "RECO": {"voice": VOICE_RECO, "plan": VOICE_PLAN["RECO"]},
+        "STAT": {"voice": VOICE_STAT, "plan": VOICE_PLAN["STAT"]},
+    }
+    
     # Conversation Dynamics
     INTERRUPTION_CHANCE = 0.25  # 25% chance of interruption
     AGREE_DISAGREE_RATIO = 0.6  # 60% agreement, 40% constructive disagreement
     
-    # Forbidden words for agents
+    # Forbidden words for agents (read-only)
     FORBIDDEN = {
-        "RECO": {"absolutely", "well", "look", "sure", "okay", "so", "listen", "hey", 
-                "you know", "hold on", "right", "great point"},
-        "STAT": {"hold on", "actually", "well", "look", "so", "right", "okay", 
-                "absolutely", "you know", "listen", "wait"},
+        "RECO": frozenset({"absolutely", "well", "look", "sure", "okay", "so", "listen", "hey", 
+                "you know", "hold on", "right", "great point"}),
+        "STAT": frozenset({"hold on", "actually", "well", "look", "so", "right", "okay", 
+                "absolutely", "you know", "listen", "wait"}),
     }
     
-    # Opening phrases for agents
+    # Forbidden phrases keyed by first word for single-lookup opener checks
+    FORBIDDEN_FIRST = {agent: _index_by_first_word(words) for agent, words in FORBIDDEN.items()}
+    
+    # Opening phrases for agents (read-only)
     OPENERS = {
-        "RECO": [
+        "RECO": (
             "Given that", "Looking at this", "From that signal", "On those figures", 
             "Based on the last month", "If we take the trend", "Against YTD context", 
             "From a planning view"
-        ],
-        "STAT": [
+        ),
+        "STAT": (
             "Data suggests", "From the integrity check", "The safer interpretation", 
             "Statistically speaking", "Given the variance profile", "From the control limits", 
             "Relative to seasonality", "From the timestamp audit"
-        ],
+        ),
     }
     
     # Fixed intro/outro lines
@@ -125,7 +145,8 @@ class Config:
     #     "Keep responses precise and evidence-based."
     # )
 
-    SYSTEM_RECO = """
+    # Prompts are dedented once here so requests don't carry the source indentation
+    SYSTEM_RECO = textwrap.dedent("""
     ROLE & PERSONA: You are Agent Reco, a senior metrics recommendation specialist. 
     You advise product, ops, and CX leaders on which metrics and methods matter most, how to monitor them, and what actions to take. 
     Voice: confident, concise, consultative, human; you sound engaged and pragmatic, not theatrical. 
@@ -153,9 +174,9 @@ class Config:
     • Always relate metric advice to an operational lever (staffing, routing, backlog policy, deflection, training, tooling, SLAs).
 
     OUTPUT FORMAT: one complete sentence, ~15–30 words, varied opener, directly tied to Stat's last line, ending with a clear recommendation.
-    """
+    """).strip()
 
-    SYSTEM_STAT = """
+    SYSTEM_STAT = textwrap.dedent("""
     ROLE & PERSONA: You are Agent Stat, a senior metric data and statistical integrity expert. 
     You validate assumptions, challenge leaps, and ground decisions in measurement quality and trend mechanics. 
     Voice: thoughtful, precise, collaborative skeptic; you protect against bad reads without slowing momentum. 
@@ -182,50 +203,39 @@ class Config:
     • Always tie your caution to a decisive next step (e.g., verify queue mapping, recalc with outlier caps, run pre/post on policy change dates).
 
     OUTPUT FORMAT: one complete sentence, ~15–30 words, varied opener, explicitly addressing Reco's last line, ending with a concrete check or risk and an immediate next step.
-    """
+    """).strip()
 
-    SYSTEM_NEXUS = """
+    SYSTEM_NEXUS = textwrap.dedent("""
     You are Agent Nexus, the warm, concise host. Your job: welcome listeners, set purpose, hand off/close cleanly. 
     For generated lines, keep to 1 sentence (15–25 words). 
     At the end, provide a comprehensive summary that highlights key points from both agents and thanks everyone.
-    """
+    """).strip()
 
 
     
     @classmethod
     def validate_azure_openai_config(cls) -> bool:
         """Validate Azure OpenAI configuration for LLM Factory."""
-        required_vars = [
-            cls.AZURE_OPENAI_ENDPOINT, 
-            cls.AZURE_OPENAI_DEPLOYMENT_NAME, 
-            cls.AZURE_OPENAI_API_VERSION,
-            cls.PROJECT_ID,
-            cls.LLM_CLIENT_ID,
+        return bool(
+            cls.AZURE_OPENAI_ENDPOINT and
+            cls.AZURE_OPENAI_DEPLOYMENT_NAME and
+            cls.AZURE_OPENAI_API_VERSION and
+            cls.PROJECT_ID and
+            cls.LLM_CLIENT_ID and
             cls.LLM_CLIENT_SECRET
-        ]
-        return all(required_vars)
+        )
     
     @classmethod
     def validate_azure_speech_config(cls) -> bool:
         """Validate Azure Speech configuration."""
-        required_vars = [
-            cls.TENANT_ID, 
-            cls.CLIENT_ID, 
-            cls.CLIENT_SECRET, 
+        return bool(
+            cls.TENANT_ID and
+            cls.CLIENT_ID and
+            cls.CLIENT_SECRET and
             cls.SPEECH_REGION
-        ]
-        return all(required_vars)
+        )
     
     @classmethod
     def get_voice_config(cls, role: str) -> Dict[str, Any]:
         """Get voice configuration for a specific role."""
-        voice_map = {
-            "NEXUS": cls.VOICE_NEXUS,
-            "RECO": cls.VOICE_RECO,
-            "STAT": cls.VOICE_STAT
-        }
-        
-        return {
-            "voice": voice_map.get(role, cls.VOICE_NEXUS),
-            "plan": cls.VOICE_PLAN.get(role, cls.VOICE_PLAN["NEXUS"])
-        }
+        return cls._VOICE_CONFIGS.get(role, cls._VOICE_CONFIGS["NEXUS"])
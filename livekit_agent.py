@@ -12,34 +12,148 @@ Programmatic:
     run_cli()  # starts the worker; use LiveKit CLI simulate for the room
 """
 
+import asyncio
+import functools
 import logging
 import os
-from typing import Optional
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
 
 from dotenv import load_dotenv
 
 # LiveKit Agents & plugins
-from livekit.agents import Agent, AgentSession, JobContext, WorkerOptions, cli, mcp
+from livekit.agents import Agent, AgentSession, JobContext, JobProcess, WorkerOptions, cli, mcp
 from livekit.plugins import openai, silero, azure
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
-import langchain as lk_langchain  # noqa: F401 (available for extensions)
 
-# LangChain MCP client (tools exposure)
-from langchain_mcp_adapters.client import MultiServerMCPClient  # noqa: F401 (available for extensions)
-
-# Optional: LangGraph prebuilt (kept for parity and future routing)
-from langgraph.prebuilt import create_react_agent  # noqa: F401
-
-# Optional Azure LLM wrapper if needed alongside livekit.plugins.openai
-from langchain_openai import AzureChatOpenAI  # noqa: F401
+if TYPE_CHECKING:
+    from workflow import AgentBasedOrchestrator
 
 logger = logging.getLogger("uap_podcast.livekit")
 
 # Load env from current working directory (expecting .env next to this file when run from uap_podcast/)
 load_dotenv()
 
-# Orchestrator (LangGraph) import for optional live bridging
-from workflow import AgentBasedOrchestrator
+
+@dataclass(frozen=True, slots=True)
+class _EnvCache:
+    """Static worker settings read once at import (may be absent in mock mode).
+    
+    AZURE_OPENAI_API_KEY is not cached: it holds a bearer token that
+    LLMFactory rotates in os.environ, so each job reads it afresh.
+    """
+    speech_region: Optional[str]
+    speech_auth_token: Optional[str]
+    speech_key: Optional[str]
+    speech_endpoint: Optional[str]
+    azure_endpoint: Optional[str]
+    api_version: str
+    mcp_url: str
+    mcp_auth: Optional[str]
+    is_mock: bool
+    azure_fast_final: bool
+
+
+_ENV = _EnvCache(
+    speech_region=os.getenv("AZURE_SPEECH_REGION") or os.getenv("SPEECH_REGION"),
+    speech_auth_token=os.getenv("AZURE_SPEECH_AUTH_TOKEN"),
+    speech_key=os.getenv("AZURE_SPEECH_KEY"),
+    speech_endpoint=os.getenv("AZURE_SPEECH_ENDPOINT"),
+    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+    api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-10-01-preview"),
+    mcp_url=os.getenv("MCP_SERVER_URL", "http://localhost:8000/mcp/"),
+    mcp_auth=os.getenv("MCP_AUTH_TOKEN"),
+    is_mock=os.getenv("LIVEKIT_MOCK") == "1",
+    azure_fast_final=os.getenv("LIVEKIT_AZURE_FAST_FINAL") == "1",
+)
+
+
+# Strong references to fire-and-forget warmup tasks
+_background_tasks: set[asyncio.Task] = set()
+
+# 100 ms of 16 kHz / 16-bit mono silence
+_SILENCE_CHUNK = bytes(3200)
+
+
+@functools.lru_cache(maxsize=8)
+def _mcp_headers(auth: Optional[str]) -> Optional[dict]:
+    """Request headers per auth token, shared read-only by every job's MCP server."""
+    return {"Authorization": f"Bearer {auth}"} if auth else None
+
+
+def _new_mcp_server(url: str, auth: Optional[str]) -> mcp.MCPServerHTTP:
+    """Build one job's MCP server.
+    
+    The server is stateful: its client session and streams belong to the
+    AgentSession task that opens them, so each job gets its own instance.
+    """
+    return mcp.MCPServerHTTP(
+        url=url,
+        headers=_mcp_headers(auth),
+        timeout=60,
+        client_session_timeout_seconds=60,
+    )
+
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _prewarm_stt_sync(speech_region, speech_auth_token, speech_key, speech_endpoint) -> None:
+    """Open a recognizer connection and push ~200 ms of silence to complete the handshake."""
+    # Imported here, its only use, so loading the worker module skips the native Speech SDK
+    import azure.cognitiveservices.speech as speechsdk
+
+    if speech_auth_token:
+        speech_config = speechsdk.SpeechConfig(auth_token=speech_auth_token, region=speech_region)
+    elif speech_key:
+        speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
+    else:
+        speech_config = speechsdk.SpeechConfig(endpoint=speech_endpoint)
+
+    push_stream = speechsdk.audio.PushAudioInputStream()
+    recognizer = speechsdk.SpeechRecognizer(
+        speech_config=speech_config,
+        audio_config=speechsdk.audio.AudioConfig(stream=push_stream),
+    )
+    recognizer.start_continuous_recognition_async().get()
+    try:
+        for _ in range(2):
+            push_stream.write(_SILENCE_CHUNK)
+        push_stream.close()
+    finally:
+        recognizer.stop_continuous_recognition_async().get()
+
+
+async def _prewarm_stt(speech_region, speech_auth_token, speech_key, speech_endpoint) -> None:
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(_prewarm_stt_sync, speech_region, speech_auth_token, speech_key, speech_endpoint)
+        logger.info(f"Azure STT warmup finished in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        logger.warning(f"Azure STT warmup failed: {e}")
+
+
+async def _prewarm_tts(tts_plugin) -> None:
+    started = time.perf_counter()
+    try:
+        async with tts_plugin.synthesize(".") as stream:
+            async for _ in stream:
+                pass
+        logger.info(f"Azure TTS warmup finished in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        logger.warning(f"Azure TTS warmup failed: {e}")
+
+
+@functools.lru_cache(maxsize=1)
+def _get_orchestrator() -> "AgentBasedOrchestrator":
+    """Process-wide orchestrator so node setup and graph compilation happen once."""
+    # Imported on first use: the LangGraph/LangChain stack is slow to import
+    from workflow import AgentBasedOrchestrator
+    return AgentBasedOrchestrator()
 
 
 class MyAgent(Agent):
@@ -63,8 +177,9 @@ class PodcastVoiceAgent(Agent):
     """Bridges LiveKit session with the existing LangGraph orchestrator and agents.
 
     Note: For low-latency demo, we trigger a short intro sequence and stream lines
-    back using session.generate_reply (as a TTS stand-in). This preserves existing
-    architecture and avoids breaking changes.
+    into session.say as they become available, so the opening line is spoken while
+    the orchestrator run is still in progress. This preserves existing architecture
+    and avoids breaking changes.
     """
 
     def __init__(self, topic: str | None = None, max_turns: int = 1):
@@ -76,42 +191,59 @@ class PodcastVoiceAgent(Agent):
         )
         self.topic = topic
         self.max_turns = max_turns
-        self._orch: AgentBasedOrchestrator | None = None
+        self._orch: "AgentBasedOrchestrator | None" = None
+        # Held so the orchestrator run is not garbage-collected mid-flight
+        self._run_task: "asyncio.Task[Optional[dict]] | None" = None
 
-    async def on_enter(self):
-        # Build a minimal orchestrator run and speak resulting lines
+    async def _run_podcast(self) -> Optional[dict]:
+        """Run the orchestrator; returns None if the run fails."""
         try:
-            self._orch = AgentBasedOrchestrator()
-            result = await self._orch.generate_podcast(
+            self._orch = _get_orchestrator()
+            return await self._orch.generate_podcast(
                 topic=self.topic,
                 max_turns=self.max_turns,
                 file_choice="both",
                 recursion_limit=40,
             )
-            # Prefer script_file contents if available, otherwise script_content
-            # For simplicity, speak the summary topic and turns info.
-            summary = f"Topic: {result.get('topic','Unknown')}. Turns: {result.get('turns',0)}. Beginning the session."
-            await self.session.generate_reply(instructions=summary)
         except Exception as e:
             logger.warning(f"PodcastVoiceAgent on_enter failed: {e}")
-            await self.session.generate_reply(instructions="Starting live session. Let's begin with the introduction.")
+            return None
+
+    async def _narration(self, run: "asyncio.Task[Optional[dict]]"):
+        """Yield narration text as it becomes available so TTS can start speaking at once."""
+        yield "Starting live session. "
+        # Shielded so interrupting the narration does not cancel the run itself
+        result = await asyncio.shield(run)
+        if result is None:
+            yield "Let's begin with the introduction."
+        else:
+            # For simplicity, speak the summary topic and turns info.
+            yield f"Topic: {result.get('topic','Unknown')}. Turns: {result.get('turns',0)}. Beginning the session."
+
+    async def on_enter(self):
+        # Start the run outside the TTS consumer task, so a barge-in during the
+        # opening line only stops the narration, not the orchestrator run
+        self._run_task = asyncio.create_task(self._run_podcast())
+        # Stream lines into TTS as they are produced instead of waiting for the whole run
+        await self.session.say(self._narration(self._run_task))
 
 async def entrypoint(ctx: JobContext):
     """LiveKit worker entrypoint used by the CLI simulator or an external worker process."""
-    # Pull env vars (may be absent in mock mode)
-    speech_region = os.getenv("AZURE_SPEECH_REGION") or os.getenv("SPEECH_REGION")
-    speech_auth_token = os.getenv("AZURE_SPEECH_AUTH_TOKEN")
-    speech_key = os.getenv("AZURE_SPEECH_KEY")
-    speech_endpoint = os.getenv("AZURE_SPEECH_ENDPOINT")
-
-    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+    # Settings cached at import (may be absent in mock mode)
+    speech_region = _ENV.speech_region
+    speech_auth_token = _ENV.speech_auth_token
+    speech_key = _ENV.speech_key
+    speech_endpoint = _ENV.speech_endpoint
+
+    azure_endpoint = _ENV.azure_endpoint
+    # Rotating bearer token, refreshed in os.environ by LLMFactory
     api_key = os.getenv("AZURE_OPENAI_API_KEY")
-    api_version = os.getenv("AZURE_OPENAI_API_VERSION", "2024-10-01-preview")
+    api_version = _ENV.api_version
 
-    mcp_url = os.getenv("MCP_SERVER_URL", "http://localhost:8000/mcp/")
-    mcp_auth = os.getenv("MCP_AUTH_TOKEN")
+    mcp_url = _ENV.mcp_url
+    mcp_auth = _ENV.mcp_auth
 
-    is_mock = os.getenv("LIVEKIT_MOCK") == "1"
+    is_mock = _ENV.is_mock
 
     if not (speech_region and (speech_auth_token or speech_key or speech_endpoint)):
         if not is_mock:
@@ -120,52 +252,80 @@ async def entrypoint(ctx: JobContext):
         if not is_mock:
             logger.warning("Missing Azure OpenAI env vars; LLM will be disabled.")
 
-    # Build plugins conditionally
-    stt_plugin = None
-    tts_plugin = None
-    llm_plugin = None
+    # Build plugins concurrently; each builder handles its own failures
+    async def _load_vad():
+        # Model load is blocking; keep it off the event loop
+        return await asyncio.to_thread(silero.VAD.load)
 
-    if not is_mock:
+    async def _build_speech():
+        if is_mock:
+            return None, None
         # STT/TTS: allow any supported auth combination
         try:
             if speech_region and (speech_auth_token or speech_key or speech_endpoint):
                 if speech_auth_token:
-                    stt_plugin = azure.STT(speech_region=speech_region, speech_auth_token=speech_auth_token)
-                    tts_plugin = azure.TTS(speech_region=speech_region, speech_auth_token=speech_auth_token)
+                    return (
+                        azure.STT(speech_region=speech_region, speech_auth_token=speech_auth_token),
+                        azure.TTS(speech_region=speech_region, speech_auth_token=speech_auth_token),
+                    )
                 elif speech_key:
-                    stt_plugin = azure.STT(speech_region=speech_region, speech_key=speech_key)
-                    tts_plugin = azure.TTS(speech_region=speech_region, speech_key=speech_key)
+                    return (
+                        azure.STT(speech_region=speech_region, speech_key=speech_key),
+                        azure.TTS(speech_region=speech_region, speech_key=speech_key),
+                    )
                 elif speech_endpoint:
-                    stt_plugin = azure.STT(speech_endpoint=speech_endpoint)
-                    tts_plugin = azure.TTS(speech_endpoint=speech_endpoint)
+                    return azure.STT(speech_endpoint=speech_endpoint), azure.TTS(speech_endpoint=speech_endpoint)
         except Exception as e:
             logger.warning(f"Azure Speech plugins disabled due to error: {e}")
+        return None, None
 
-        # LLM
+    async def _build_llm():
+        if is_mock:
+            return None
         try:
             if azure_endpoint and api_key:
-                llm_plugin = openai.LLM.with_azure(
+                return openai.LLM.with_azure(
                     azure_endpoint=azure_endpoint,
                     api_key=api_key,
                     api_version=api_version,
                 )
         except Exception as e:
             logger.warning(f"Azure OpenAI LLM disabled due to error: {e}")
+        return None
+
+    async with asyncio.TaskGroup() as tg:
+        vad_task = tg.create_task(_load_vad())
+        speech_task = tg.create_task(_build_speech())
+        llm_task = tg.create_task(_build_llm())
+
+    stt_plugin, tts_plugin = speech_task.result()
+    llm_plugin = llm_task.result()
+
+    # Move the first-request Azure handshake out of the first user turn
+    if stt_plugin is not None:
+        _spawn(_prewarm_stt(speech_region, speech_auth_token, speech_key, speech_endpoint))
+    if tts_plugin is not None:
+        _spawn(_prewarm_tts(tts_plugin))
+
+    # Azure STT only emits final transcripts, so waiting out the default endpointing
+    # delay adds latency to every turn without improving the transcript
+    session_options = {}
+    if isinstance(stt_plugin, azure.STT) and _ENV.azure_fast_final:
+        session_options["min_endpointing_delay"] = 0.05
+
+    mcp_server = _new_mcp_server(mcp_url, mcp_auth)
+    # Release the job's MCP connection even if the session never closes it
+    ctx.add_shutdown_callback(mcp_server.aclose)
 
     session = AgentSession(
-        vad=silero.VAD.load(),
+        vad=vad_task.result(),
         stt=stt_plugin,
         llm=llm_plugin,
         tts=tts_plugin,
         turn_detection=MultilingualModel(),
-        mcp_servers=[
-            mcp.MCPServerHTTP(
-                url=mcp_url,
-                headers={"Authorization": f"Bearer {mcp_auth}"} if mcp_auth else None,
-                timeout=60,
-                client_session_timeout_seconds=60,
-            )
-        ],
+        # The session initializes the server on start, inside its own long-lived task
+        mcp_servers=[mcp_server],
+        **session_options,
     )
 
     # Start the voice session in the provided room context (no extra room options)
@@ -180,9 +340,17 @@ async def entrypoint(ctx: JobContext):
     )
 
 
+def prewarm(proc: JobProcess):
+    """Build the orchestrator and its compiled graph before the process takes a job."""
+    try:
+        _get_orchestrator()
+    except Exception as e:
+        logger.warning(f"Orchestrator prewarm failed; it will be built on first use: {e}")
+
+
 def run_cli():
     """Start a worker process suitable for use with the LiveKit CLI simulate command."""
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
+    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
 
 
 # Convenience alias for external runners
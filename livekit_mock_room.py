@@ -37,21 +37,36 @@ class FakeAgentSession:
         self.args = args
         self.kwargs = kwargs
         self.started = False
+        # Set from outside to end the simulated session early
+        self.stop_event = asyncio.Event()
+
+    async def _lifecycle(self, room: FakeRoom, duration: float = 0.1):
+        """Keep the room open for a short simulated session, then close it."""
+        try:
+            await asyncio.wait_for(self.stop_event.wait(), timeout=duration)
+        except asyncio.TimeoutError:
+            pass
+        await room.close()
 
     async def start(self, agent: MyAgent, room: FakeRoom):
         logger.info("FakeAgentSession: start called with FakeRoom")
         self.started = True
 
         class _AgentSessionBinding:
-            async def generate_reply(self_inner):
+            async def generate_reply(self_inner, **kwargs):
                 logger.info("FakeAgentSession: generate_reply invoked (mock)")
 
+            async def say(self_inner, text):
+                if not isinstance(text, str):
+                    text = "".join([chunk async for chunk in text])
+                logger.info(f"FakeAgentSession: say invoked (mock): {text}")
+
         # Bind a minimal session object to the agent, mimicking real behavior
         agent.session = _AgentSessionBinding()
-        await agent.on_enter()
-        # Simulate short-lived session, then close
-        await asyncio.sleep(0.1)
-        await room.close()
+        # Run the agent alongside the room lifecycle; a failure in either cancels both
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(agent.on_enter())
+            tg.create_task(self._lifecycle(room))
         logger.info("FakeAgentSession: session finished")
 
 
@@ -0,0 +1,79 @@
+"""PCM preprocessing helpers for speech recognition input."""
+
+import functools
+import numpy as np
+from numba import njit
+
+
+# Taps in the anti-alias low-pass applied before downsampling
+LOWPASS_TAPS = 63
+
+
+@functools.lru_cache(maxsize=8)
+def _lowpass_taps(in_sr: int, out_sr: int) -> np.ndarray:
+    """Hamming-windowed sinc low-pass at the output Nyquist, with unity DC gain."""
+    cutoff = out_sr / (2 * in_sr)
+    n = np.arange(LOWPASS_TAPS) - (LOWPASS_TAPS - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(LOWPASS_TAPS)
+    return taps / taps.sum()
+
+
+@njit(cache=True, fastmath=True)
+def _mix_and_resample(channels: np.ndarray, in_sr: int, out_sr: int, taps: np.ndarray) -> np.ndarray:
+    """Average channels, low-pass with taps and linearly interpolate to the target rate."""
+    n_channels, n_in = channels.shape
+    mono = np.zeros(n_in)
+    for c in range(n_channels):
+        for j in range(n_in):
+            mono[j] += channels[c, j]
+    mono /= n_channels
+    
+    n_taps = taps.shape[0]
+    if n_taps > 1:
+        # Edge samples are repeated past either end so the borders keep their level
+        half = n_taps // 2
+        filtered = np.empty(n_in)
+        for j in range(n_in):
+            acc = 0.0
+            for t in range(n_taps):
+                src = min(max(j + t - half, 0), n_in - 1)
+                acc += mono[src] * taps[t]
+            filtered[j] = acc
+        mono = filtered
+    
+    n_out = n_in * out_sr // in_sr
+    out = np.empty(n_out, dtype=np.int16)
+    step = in_sr / out_sr
+    
+    for i in range(n_out):
+        pos = i * step
+        j = int(pos)
+        k = min(j + 1, n_in - 1)
+        frac = pos - j
+        value = round(mono[j] * (1.0 - frac) + mono[k] * frac)
+        # Filter overshoot on full-scale input must saturate, not wrap
+        out[i] = max(-32768, min(32767, value))
+    
+    return out
+
+
+def downmix_and_resample(pcm_i16: np.ndarray, channels: int, in_sr: int, out_sr: int) -> np.ndarray:
+    """
+    Convert interleaved 16-bit PCM to mono at a new sample rate.
+    
+    When downsampling, content above the new Nyquist frequency is filtered
+    out first so it does not alias into the speech band.
+    
+    Args:
+        pcm_i16: Interleaved int16 samples
+        channels: Number of interleaved channels
+        in_sr: Input sample rate
+        out_sr: Output sample rate
+    
+    Returns:
+        Mono int16 samples at out_sr
+    """
+    # One contiguous row per channel keeps the inner loop cache-friendly
+    planar = np.ascontiguousarray(pcm_i16.reshape(-1, channels).T, dtype=np.float32)
+    taps = _lowpass_taps(in_sr, out_sr) if out_sr < in_sr else np.ones(1)
+    return _mix_and_resample(planar, in_sr, out_sr, taps)
@@ -0,0 +1,14 @@
+"""Shared Azure AD credentials for the speech services."""
+
+import functools
+from azure.identity import ClientSecretCredential
+
+
+@functools.lru_cache(maxsize=4)
+def get_credential(tenant_id: str, client_id: str, client_secret: str) -> ClientSecretCredential:
+    """Get the process-wide credential for a service principal, sharing its token cache."""
+    return ClientSecretCredential(
+        tenant_id=tenant_id,
+        client_id=client_id,
+        client_secret=client_secret
+    )
@@ -1,38 +1,312 @@
 import os
+import json
+import atexit
 import asyncio
+import hashlib
+import threading
+import httpx
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from pathlib import Path
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from langchain_openai import AzureChatOpenAI
+from langchain_core.messages import messages_from_dict, messages_to_dict
+from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 from .token_manager import TokenManager  
 from .logging import default_logger as logger
 
+load_dotenv()
+
+
+@dataclass(frozen=True, slots=True)
+class _EnvCache:
+    """
+    Snapshot of the LLM environment, read once at import.
+    """
+    endpoint: Optional[str]
+    api_version: str
+    deployment: str
+    project_id: Optional[str]
+    client_id: Optional[str]
+    client_secret: Optional[str]
+    idp: str
+    auth_url: str
+    grant_type: str
+    scope: str
+
+
+_ENV = _EnvCache(
+    endpoint        = os.getenv("AZURE_OPENAI_ENDPOINT"),
+    api_version     = os.getenv("AZURE_OPENAI_API_VERSION", "2023-06-01-preview"),
+    deployment      = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-35-turbo"),
+    project_id      = os.getenv("PROJECT_ID"),
+    client_id       = os.getenv("LLM_CLIENT_ID"),
+    client_secret   = os.getenv("LLM_CLIENT_SECRET"),
+    idp             = os.getenv("AOG_GATEWAY_IDP", "azuread"),
+    auth_url        = os.getenv("LLM_AUTH_URL", "https://api.uhg.com/oauth2/token"),
+    grant_type      = os.getenv("LLM_GRANT_TYPE", "client_credentials"),
+    scope           = os.getenv("LLM_SCOPE", "https://api.uhg.com/.default"),
+)
+
+
 class LLMConfig:
     """
-    Loads application configuration from environment variables.
+    Application configuration, a view over the environment snapshot taken at import.
     """
     def __init__(self):
-        load_dotenv()
-        self.endpoint           = os.getenv("AZURE_OPENAI_ENDPOINT")
-        self.api_version        = os.getenv("AZURE_OPENAI_API_VERSION", "2023-06-01-preview")
-        self.deployment         = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-35-turbo")
-        self.project_id         = os.getenv("PROJECT_ID")
-        self.client_id          = os.getenv("LLM_CLIENT_ID")
-        self.client_secret      = os.getenv("LLM_CLIENT_SECRET")
-        self.idp                = os.getenv("AOG_GATEWAY_IDP", "azuread")
-        self.auth_url           = os.getenv("LLM_AUTH_URL", "https://api.uhg.com/oauth2/token")
-        self.grant_type         = os.getenv("LLM_GRANT_TYPE", "client_credentials")
-        self.scope              = os.getenv("LLM_SCOPE", "https://api.uhg.com/.default")
+        self.endpoint           = _ENV.endpoint
+        self.api_version        = _ENV.api_version
+        self.deployment         = _ENV.deployment
+        self.project_id         = _ENV.project_id
+        self.client_id          = _ENV.client_id
+        self.client_secret      = _ENV.client_secret
+        self.idp                = _ENV.idp
+        self.auth_url           = _ENV.auth_url
+        self.grant_type         = _ENV.grant_type
+        self.scope              = _ENV.scope
+        self._headers           = {
+            name: value
+            for name, value in (("projectId", self.project_id), ("x-idp", self.idp))
+            if value
+        }
 
     def default_headers(self):
         """
         Returns default headers for API requests.
         """
-        headers = {}
-        if self.project_id:
-            headers["projectId"] = self.project_id
-        if self.idp:
-            headers["x-idp"]     = self.idp
-        return headers
-    
+        return self._headers
+
+
+# One AzureChatOpenAI (and its HTTP connection pool) per running event loop:
+# loop -> (llm, async http client, token). The pool's transports keep their
+# loop alive, so entries for closed loops are released explicitly
+_llm_by_loop: dict = {}
+# Closes of clients left behind by closed loops
+_closing_clients: set = set()
+
+
+async def _aclose_quietly(client: httpx.AsyncClient):
+    try:
+        await client.aclose()
+    except Exception as e:
+        # Connections opened on a loop that has since closed may not shut down cleanly
+        logger.debug(f"Could not close stale LLM client: {e}")
+
+
+def _release_closed_loops():
+    """Drop clients cached for loops that have closed and close their pools."""
+    for stale_loop in [loop for loop in list(_llm_by_loop) if loop.is_closed()]:
+        _, http_client, _ = _llm_by_loop.pop(stale_loop)
+        task = asyncio.create_task(_aclose_quietly(http_client))
+        _closing_clients.add(task)
+        task.add_done_callback(_closing_clients.discard)
+
+
+def _jsonable(obj):
+    """JSON fallback for LangChain message objects."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    return str(obj)
+
+
+class SemanticLLMCache:
+    """
+    Embedding-similarity cache: serves a stored response when a new prompt is
+    close enough (cosine) to one answered before. Vectors are kept normalised
+    so a flat inner-product search gives cosine similarity.
+    The index is partitioned by a key for everything but the messages (model,
+    bound parameters, call arguments), so a match never crosses parameter sets.
+    """
+    def __init__(self, embeddings, threshold: float = 0.95, path=None):
+        self.embeddings     = embeddings
+        self.threshold      = threshold
+        self.path           = Path(path) if path else None
+        # partition -> stacked vectors / responses in the same order
+        self.vectors        = {}
+        self.responses      = {}
+        if self.path:
+            self.load()
+
+    @staticmethod
+    def _text(messages) -> str:
+        if isinstance(messages, str):
+            return messages
+        return "\n".join(f"{getattr(m, 'type', '')}: {getattr(m, 'content', m)}" for m in messages)
+
+    @staticmethod
+    def _normalise(vec) -> np.ndarray:
+        vec = np.asarray(vec, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _match(self, vec: np.ndarray, partition: str):
+        vectors = self.vectors.get(partition)
+        if vectors is None:
+            return None
+        scores = vectors @ vec
+        best = int(np.argmax(scores))
+        return self.responses[partition][best] if scores[best] >= self.threshold else None
+
+    def lookup(self, messages, partition: str):
+        """
+        Returns (embedding, cached response or None).
+        """
+        vec = self._normalise(self.embeddings.embed_query(self._text(messages)))
+        return vec, self._match(vec, partition)
+
+    async def alookup(self, messages, partition: str):
+        """
+        Async variant of lookup.
+        """
+        vec = self._normalise(await self.embeddings.aembed_query(self._text(messages)))
+        return vec, self._match(vec, partition)
+
+    def add(self, vec: np.ndarray, response, partition: str):
+        vectors = self.vectors.get(partition)
+        self.vectors[partition] = vec[None, :] if vectors is None else np.vstack([vectors, vec])
+        self.responses.setdefault(partition, []).append(response)
+
+    def save(self):
+        """
+        Persists vectors and responses next to self.path.
+        """
+        if not self.path or not self.vectors:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(self.path.with_suffix(".npz"), **self.vectors)
+        self.path.with_suffix(".json").write_text(json.dumps(
+            {partition: messages_to_dict(responses) for partition, responses in self.responses.items()}
+        ))
+
+    def load(self):
+        vectors_file = self.path.with_suffix(".npz")
+        responses_file = self.path.with_suffix(".json")
+        if vectors_file.exists() and responses_file.exists():
+            with np.load(vectors_file) as vectors:
+                self.vectors = {partition: vectors[partition] for partition in vectors.files}
+            self.responses = {
+                partition: messages_from_dict(responses)
+                for partition, responses in json.loads(responses_file.read_text()).items()
+            }
+
+
+class CachedLLM:
+    """
+    Caching proxy for deterministic (temperature 0) LLM calls.
+    Responses are keyed by deployment, bound parameters, messages and call arguments.
+    """
+    # Shared across all proxies in the process; TTLCache is not thread-safe
+    cache = TTLCache(maxsize=1024, ttl=3600)
+    _lock = threading.Lock()
+    stats = {"hits": 0, "semantic_hits": 0, "misses": 0}
+    # Optional SemanticLLMCache consulted on exact-cache misses
+    semantic = None
+
+    def __init__(self, llm, deployment=None, temperature=None, bound_kwargs=None):
+        self.llm            = llm
+        self.deployment     = deployment
+        self.temperature    = temperature if temperature is not None else getattr(llm, "temperature", None)
+        self.bound_kwargs   = bound_kwargs or {}
+
+    def bind(self, **kwargs):
+        """
+        Binds call parameters, keeping the cache in front of the bound runnable.
+        """
+        return CachedLLM(
+            self.llm.bind(**kwargs),
+            deployment=self.deployment,
+            temperature=kwargs.get("temperature", self.temperature),
+            bound_kwargs={**self.bound_kwargs, **kwargs},
+        )
+
+    @staticmethod
+    def _digest(*parts) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(json.dumps(part, sort_keys=True, default=_jsonable).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _cache_key(self, messages, args, kwargs):
+        """
+        Returns (exact key, semantic partition), or (None, None) when the call is not cacheable.
+        The partition covers everything but the messages.
+        """
+        if self.temperature:
+            return None, None
+        partition = self._digest(
+            {"model": self.deployment, "params": self.bound_kwargs, "args": args, "kwargs": kwargs}
+        )
+        return self._digest(partition, messages), partition
+
+    def _lookup(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            response = self.cache.get(key)
+            if response is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            hits, misses = self.stats["hits"], self.stats["misses"]
+        logger.info(f"LLM cache hit (hits={hits}, misses={misses})")
+        return response
+
+    def _store(self, key, partition, vec, response, semantic_hit: bool):
+        if key is None:
+            return
+        with self._lock:
+            self.cache[key] = response
+            if semantic_hit:
+                self.stats["semantic_hits"] += 1
+                semantic_hits = self.stats["semantic_hits"]
+            elif vec is not None:
+                try:
+                    self.semantic.add(vec, response, partition)
+                except Exception as e:
+                    logger.warning(f"Semantic cache store failed: {e}")
+        if semantic_hit:
+            logger.info(f"LLM semantic cache hit (semantic_hits={semantic_hits})")
+
+    def invoke(self, messages, *args, **kwargs):
+        key, partition = self._cache_key(messages, args, kwargs)
+        response = self._lookup(key)
+        if response is not None:
+            return response
+        vec = None
+        if key is not None and self.semantic is not None:
+            try:
+                vec, response = self.semantic.lookup(messages, partition)
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup failed, treating as a miss: {e}")
+        semantic_hit = response is not None
+        if not semantic_hit:
+            response = self.llm.invoke(messages, *args, **kwargs)
+        self._store(key, partition, vec, response, semantic_hit)
+        return response
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        key, partition = self._cache_key(messages, args, kwargs)
+        response = self._lookup(key)
+        if response is not None:
+            return response
+        vec = None
+        if key is not None and self.semantic is not None:
+            try:
+                vec, response = await self.semantic.alookup(messages, partition)
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup failed, treating as a miss: {e}")
+        semantic_hit = response is not None
+        if not semantic_hit:
+            response = await self.llm.ainvoke(messages, *args, **kwargs)
+        self._store(key, partition, vec, response, semantic_hit)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
 
 class LLMFactory:
     """
@@ -55,18 +329,63 @@ class LLMFactory:
             # Set for LangChain usage
             os.environ["AZURE_OPENAI_API_KEY"] = token 
 
-        llm = AzureChatOpenAI(
-            azure_deployment=os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME"),
-            api_version=os.environ.get("AZURE_OPENAI_API_VERSION"),
-            temperature=0,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-            default_headers={
-                "projectId": os.environ.get("PROJECT_ID")
-            }
+        deployment = self.cfg.deployment
+        loop = asyncio.get_running_loop()
+        _release_closed_loops()
+        cached = _llm_by_loop.get(loop)
+        if cached is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                http2=True
+            )
+            llm = AzureChatOpenAI(
+                azure_deployment=deployment,
+                api_version=self.cfg.api_version,
+                temperature=0,
+                max_tokens=None,
+                timeout=None,
+                max_retries=2,
+                default_headers=self.cfg.default_headers(),
+                http_async_client=http_client
+            )
+        else:
+            llm, http_client, cached_token = cached
+            if cached_token != token:
+                # Rotate the key on the live clients instead of rebuilding the pool
+                llm.root_client.api_key = token
+                llm.root_async_client.api_key = token
+        _llm_by_loop[loop] = (llm, http_client, token)
+        if CachedLLM.semantic is None and os.environ.get("LLM_SEMANTIC_CACHE") == "1":
+            CachedLLM.semantic = self._create_semantic_cache(token)
+        elif CachedLLM.semantic is not None:
+            embeddings = CachedLLM.semantic.embeddings
+            if embeddings.openai_api_key is None or embeddings.openai_api_key.get_secret_value() != token:
+                # The embeddings client keeps the key it was built with
+                CachedLLM.semantic.embeddings = self._create_embeddings(token)
+        return CachedLLM(llm, deployment=deployment)
+
+    def _create_embeddings(self, token: str) -> AzureOpenAIEmbeddings:
+        """
+        Builds the embeddings client used by the semantic cache tier.
+        """
+        return AzureOpenAIEmbeddings(
+            azure_deployment=os.environ.get("LLM_SEMANTIC_CACHE_DEPLOYMENT", "text-embedding-3-small"),
+            api_version=self.cfg.api_version,
+            api_key=token,
+            default_headers=self.cfg.default_headers()
+        )
+
+    def _create_semantic_cache(self, token: str) -> SemanticLLMCache:
+        """
+        Builds the semantic cache tier from LLM_SEMANTIC_CACHE_* settings.
+        """
+        cache = SemanticLLMCache(
+            self._create_embeddings(token),
+            threshold=float(os.environ.get("LLM_SEMANTIC_CACHE_THRESHOLD", "0.95")),
+            path=os.environ.get("LLM_SEMANTIC_CACHE_PATH"),
         )
-        return llm
+        atexit.register(cache.save)
+        return cache
 
 async def main():
     """
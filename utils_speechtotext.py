@@ -3,16 +3,260 @@ Azure Speech-to-Text integration for Chainlit podcast app
 """
 
 import asyncio
-import tempfile
-import os
-from typing import Optional
+import io
+import itertools
+import threading
+import time
+import wave
+import weakref
+from typing import Dict, Optional, Tuple
+import orjson
+import numpy as np
 import azure.cognitiveservices.speech as speechsdk
-from azure.identity import ClientSecretCredential
 
+from uap_podcast.utils.audio import downmix_and_resample
 from uap_podcast.utils.config import Config
+from uap_podcast.utils.credentials import get_credential
 from uap_podcast.utils.logging import default_logger
 
 
+class SttMux:
+    """Shares one Azure recognizer between all STT requests in the process.
+    
+    A single recognizer runs continuous recognition over one push stream.
+    Each utterance is appended to the stream and its result is routed back
+    by the audio offset range it occupies, so concurrent callers share one
+    connection instead of opening one each.
+    """
+    
+    # Format of the shared push stream: 16 kHz / 16-bit mono PCM
+    SAMPLE_RATE = 16000
+    SAMPLE_WIDTH = 2
+    CHANNELS = 1
+    BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS
+    # Azure reports result offsets in 100 ns ticks
+    TICKS_PER_BYTE = 10_000_000 / BYTES_PER_SECOND
+    # 100 ms of audio per push
+    CHUNK_BYTES = 3200
+    # Silence appended after each utterance so the recognizer closes the phrase
+    TRAILING_SILENCE = bytes(BYTES_PER_SECOND)
+    # Extra time to wait for a result beyond the utterance length
+    RESULT_TIMEOUT_SLACK = 5.0
+    # Refresh the AAD token this many seconds before it expires
+    TOKEN_REFRESH_MARGIN = 60
+    # Utterances in flight on the shared connection
+    MAX_IN_FLIGHT = 8
+    
+    _instances: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SttMux]" = weakref.WeakKeyDictionary()
+    
+    @classmethod
+    def instance(cls) -> "SttMux":
+        """Get or create the multiplexer for the running event loop.
+        
+        Its locks and result futures belong to one loop, so each loop gets its own.
+        """
+        loop = asyncio.get_running_loop()
+        mux = cls._instances.get(loop)
+        if mux is None:
+            mux = cls._instances[loop] = cls()
+        return mux
+    
+    def __init__(self):
+        """Set up the multiplexer from the Azure Speech configuration."""
+        self.speech_region = Config.SPEECH_REGION
+        self.resource_id = Config.RESOURCE_ID
+        self.credential = get_credential(Config.TENANT_ID, Config.CLIENT_ID, Config.CLIENT_SECRET)
+        self._token: Optional[str] = None
+        self._token_exp: float = 0
+        
+        # Pending utterances: request id -> (start tick, end tick, future)
+        self._request_ids = itertools.count()
+        self._pending: Dict[int, Tuple[int, int, asyncio.Future]] = {}
+        self._pending_lock = threading.Lock()
+        self._write_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(self.MAX_IN_FLIGHT)
+        # End of the latest recognized result; the recognizer is working on audio past it
+        self._processed_bytes = 0
+        
+        # Long-lived recognizer bound to a push stream; built on first use off the
+        # event loop (token fetch is a blocking AAD call) and rebuilt if recognition stops
+        self._generation = 0
+        self._restart_needed = False
+        self._speech_config: Optional[speechsdk.SpeechConfig] = None
+        self._push_stream: Optional[speechsdk.audio.PushAudioInputStream] = None
+        self._recognizer: Optional[speechsdk.SpeechRecognizer] = None
+        self._start_future = None
+    
+    def _build_recognizer(self, token: str) -> None:
+        """Create a push stream and recognizer and start continuous recognition on them."""
+        self._generation += 1
+        generation = self._generation
+        
+        self._speech_config = speechsdk.SpeechConfig(auth_token=token, region=self.speech_region)
+        self._speech_config.speech_recognition_language = "en-US"
+        self._push_stream = speechsdk.audio.PushAudioInputStream(
+            stream_format=speechsdk.audio.AudioStreamFormat(
+                samples_per_second=self.SAMPLE_RATE,
+                bits_per_sample=self.SAMPLE_WIDTH * 8,
+                channels=self.CHANNELS
+            )
+        )
+        self._recognizer = speechsdk.SpeechRecognizer(
+            speech_config=self._speech_config,
+            audio_config=speechsdk.audio.AudioConfig(stream=self._push_stream)
+        )
+        # Events from a replaced recognizer carry a stale generation and are ignored
+        self._recognizer.recognized.connect(lambda evt: self._on_recognized(evt, generation))
+        self._recognizer.canceled.connect(lambda evt: self._on_canceled(evt, generation))
+        self._recognizer.session_stopped.connect(lambda evt: self._on_stopped(generation))
+        self._start_future = self._recognizer.start_continuous_recognition_async()
+        # Result offsets restart from zero on the new stream
+        self._stream_bytes = 0
+        self._processed_bytes = 0
+        self._restart_needed = False
+    
+    def _connect(self) -> None:
+        """Build the recognizer with a fresh token, replacing a stopped one (blocking)."""
+        old_recognizer, old_stream = self._recognizer, self._push_stream
+        # Build first so events from stopping the old recognizer are already stale
+        self._build_recognizer(self._fetch_token())
+        if old_recognizer is not None:
+            old_stream.close()
+            old_recognizer.stop_continuous_recognition_async()
+    
+    def _fetch_token(self) -> str:
+        """Fetch a fresh authentication token and cache it with its expiry."""
+        token_obj = self.credential.get_token("https://cognitiveservices.azure.com/.default")
+        token = token_obj.token
+        self._token = f"aad#{self.resource_id}#{token}" if self.resource_id else token
+        self._token_exp = token_obj.expires_on
+        return self._token
+    
+    async def _get_auth_token(self) -> str:
+        """Get authentication token for Azure Speech service, refreshing near expiry."""
+        if self._token and time.time() < self._token_exp - self.TOKEN_REFRESH_MARGIN:
+            return self._token
+        
+        token = await asyncio.to_thread(self._fetch_token)
+        # Rotate the token on the live config and recognizer
+        self._speech_config.authorization_token = token
+        self._recognizer.authorization_token = token
+        return token
+    
+    async def _ensure_started(self) -> None:
+        """Connect and wait for continuous recognition to start, restarting it if it stopped.
+        
+        Called under the write lock.
+        """
+        if self._restart_needed:
+            default_logger.warning("Speech recognizer stopped; reconnecting")
+            # Utterances pushed to the old stream will never get a result
+            with self._pending_lock:
+                futures = [future for _, _, future in self._pending.values()]
+                self._pending.clear()
+            for future in futures:
+                self._resolve(future, None)
+        if self._recognizer is None or self._restart_needed:
+            await asyncio.to_thread(self._connect)
+        if self._start_future is not None:
+            await asyncio.to_thread(self._start_future.get)
+            self._start_future = None
+    
+    def _push(self, pcm: bytes) -> None:
+        """Write PCM to the shared stream in fixed-size chunks."""
+        for offset in range(0, len(pcm), self.CHUNK_BYTES):
+            self._push_stream.write(pcm[offset:offset + self.CHUNK_BYTES])
+        self._stream_bytes += len(pcm)
+    
+    async def prewarm(self) -> None:
+        """Start recognition and push ~100 ms of silence to open the connection early."""
+        try:
+            async with self._write_lock:
+                await self._ensure_started()
+                self._push(bytes(self.CHUNK_BYTES))
+        except Exception as e:
+            default_logger.warning(f"Speech recognizer prewarm failed: {e}")
+    
+    @staticmethod
+    def _resolve(future: asyncio.Future, result) -> None:
+        if not future.done():
+            future.set_result(result)
+    
+    def _on_recognized(self, evt, generation: int) -> None:
+        """Route a result to the utterance whose audio range contains its offset."""
+        if generation != self._generation:
+            return
+        payload = orjson.loads(evt.result.json) if evt.result.json else {}
+        offset = payload.get("Offset", evt.result.offset)
+        duration = payload.get("Duration", evt.result.duration)
+        default_logger.debug(f"STT result at {offset}+{duration}: {payload.get('DisplayText', '')}")
+        self._processed_bytes = max(self._processed_bytes, int((offset + duration) / self.TICKS_PER_BYTE))
+        with self._pending_lock:
+            match = next(
+                (future for start, end, future in self._pending.values() if start <= offset < end),
+                None
+            )
+        # Keep recognize_once semantics: the first result per utterance wins
+        if match is not None:
+            match.get_loop().call_soon_threadsafe(self._resolve, match, evt.result)
+    
+    def _on_canceled(self, evt, generation: int) -> None:
+        """Fail all pending utterances and schedule a restart if the recognizer errors out."""
+        if generation != self._generation:
+            return
+        if evt.cancellation_details.reason != speechsdk.CancellationReason.Error:
+            return
+        default_logger.error(f"Speech recognizer canceled: {evt.cancellation_details.error_details}")
+        self._restart_needed = True
+        self._fail_pending(evt.result)
+    
+    def _on_stopped(self, generation: int) -> None:
+        """Schedule a restart when the recognition session ends."""
+        if generation != self._generation:
+            return
+        self._restart_needed = True
+        self._fail_pending(None)
+    
+    def _fail_pending(self, result) -> None:
+        """Resolve every pending utterance with the given result (from an SDK thread)."""
+        with self._pending_lock:
+            futures = [future for _, _, future in self._pending.values()]
+        for future in futures:
+            future.get_loop().call_soon_threadsafe(self._resolve, future, result)
+    
+    async def submit(self, pcm: bytes) -> Optional[speechsdk.SpeechRecognitionResult]:
+        """
+        Recognize one utterance of stream-format PCM.
+        
+        Returns:
+            The first recognition result for the utterance, or None on timeout
+        """
+        async with self._slots:
+            done = asyncio.get_running_loop().create_future()
+            
+            async with self._write_lock:
+                await self._ensure_started()
+                await self._get_auth_token()
+                request_id = next(self._request_ids)
+                start_tick = int(self._stream_bytes * self.TICKS_PER_BYTE)
+                end_tick = int((self._stream_bytes + len(pcm)) * self.TICKS_PER_BYTE)
+                with self._pending_lock:
+                    self._pending[request_id] = (start_tick, end_tick, done)
+                self._push(pcm)
+                self._push(self.TRAILING_SILENCE)
+                # Wait for everything queued ahead on the stream, not just this utterance
+                backlog = self._stream_bytes - self._processed_bytes
+            
+            try:
+                timeout = backlog / self.BYTES_PER_SECOND + self.RESULT_TIMEOUT_SLACK
+                return await asyncio.wait_for(done, timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                with self._pending_lock:
+                    self._pending.pop(request_id, None)
+
+
 class SpeechToTextService:
     """Service for converting audio to text using Azure Speech Services."""
     
@@ -26,66 +270,42 @@ class SpeechToTextService:
         
         if not all([self.tenant_id, self.client_id, self.client_secret, self.speech_region]):
             raise RuntimeError("Missing Azure Speech credentials")
-        
-        self.credential = ClientSecretCredential(
-            tenant_id=self.tenant_id,
-            client_id=self.client_id,
-            client_secret=self.client_secret
-        )
     
-    def _get_auth_token(self) -> str:
-        """Get authentication token for Azure Speech service."""
-        token = self.credential.get_token("https://cognitiveservices.azure.com/.default").token
-        return f"aad#{self.resource_id}#{token}" if self.resource_id else token
+    def _read_pcm(self, audio_bytes: bytes) -> bytes:
+        """Extract PCM frames from an in-memory WAV, converted to the stream format."""
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav_file:
+            frame_rate = wav_file.getframerate()
+            sample_width = wav_file.getsampwidth()
+            channels = wav_file.getnchannels()
+            pcm = wav_file.readframes(wav_file.getnframes())
+        
+        if (frame_rate, sample_width, channels) == (SttMux.SAMPLE_RATE, SttMux.SAMPLE_WIDTH, SttMux.CHANNELS):
+            return pcm
+        if sample_width != SttMux.SAMPLE_WIDTH:
+            raise ValueError(f"Unsupported WAV sample width {sample_width * 8} bits; expected 16-bit")
+        samples = np.frombuffer(pcm, dtype="<i2")
+        return downmix_and_resample(samples, channels, frame_rate, SttMux.SAMPLE_RATE).tobytes()
     
     async def audio_bytes_to_text(self, audio_bytes: bytes) -> str:
         """Convert audio bytes to text using Azure Speech Recognition."""
         try:
-            # Create temporary file for the audio
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_bytes)
-                temp_path = temp_file.name
+            # WAV parsing and resampling (incl. the first Numba compile) stay off the loop
+            pcm = await asyncio.to_thread(self._read_pcm, audio_bytes)
+            result = await SttMux.instance().submit(pcm)
             
-            try:
-                # Configure speech recognition
-                speech_config = speechsdk.SpeechConfig(
-                    auth_token=self._get_auth_token(),
-                    region=self.speech_region
-                )
-                speech_config.speech_recognition_language = "en-US"
-                
-                # Create audio config from file
-                audio_config = speechsdk.audio.AudioConfig(filename=temp_path)
-                
-                # Create speech recognizer
-                speech_recognizer = speechsdk.SpeechRecognizer(
-                    speech_config=speech_config,
-                    audio_config=audio_config
-                )
-                
-                # Perform recognition
-                result = await asyncio.to_thread(speech_recognizer.recognize_once)
-                
-                if result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                    default_logger.info(f"Speech recognition successful: {result.text}")
-                    return result.text
-                elif result.reason == speechsdk.ResultReason.NoMatch:
-                    default_logger.warning("No speech could be recognized")
-                    return "Sorry, I couldn't understand the audio. Please try speaking more clearly."
-                elif result.reason == speechsdk.ResultReason.Canceled:
-                    cancellation_details = result.cancellation_details
-                    default_logger.error(f"Speech recognition canceled: {cancellation_details.reason}")
-                    return f"Speech recognition failed: {cancellation_details.error_details}"
-                else:
-                    default_logger.error(f"Unexpected speech recognition result: {result.reason}")
-                    return "Speech recognition failed due to an unexpected error."
-                    
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_path)
-                except OSError:
-                    pass
+            if result is None or result.reason == speechsdk.ResultReason.NoMatch:
+                default_logger.warning("No speech could be recognized")
+                return "Sorry, I couldn't understand the audio. Please try speaking more clearly."
+            elif result.reason == speechsdk.ResultReason.RecognizedSpeech:
+                default_logger.info(f"Speech recognition successful: {result.text}")
+                return result.text
+            elif result.reason == speechsdk.ResultReason.Canceled:
+                cancellation_details = result.cancellation_details
+                default_logger.error(f"Speech recognition canceled: {cancellation_details.reason}")
+                return f"Speech recognition failed: {cancellation_details.error_details}"
+            else:
+                default_logger.error(f"Unexpected speech recognition result: {result.reason}")
+                return "Speech recognition failed due to an unexpected error."
                     
         except Exception as e:
             default_logger.error(f"Error in speech to text conversion: {e}")
@@ -95,11 +315,21 @@ class SpeechToTextService:
 # Global instance for the Chainlit app
 speech_service = None
 
+# Strong references to fire-and-forget tasks so they are not garbage-collected mid-run
+_background_tasks: set[asyncio.Task] = set()
+
 def get_speech_service() -> SpeechToTextService:
     """Get or create the global speech service instance."""
     global speech_service
     if speech_service is None:
         speech_service = SpeechToTextService()
+        try:
+            # Open the recognizer connection in the background when a loop is running
+            task = asyncio.get_running_loop().create_task(SttMux.instance().prewarm())
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        except RuntimeError:
+            pass
     return speech_service
 
 
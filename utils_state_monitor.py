@@ -3,23 +3,49 @@ Real-time LangGraph State Monitor
 Integrates with the existing workflow to provide live state visualization.
 """
 
-import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Callable
 from pathlib import Path
 import threading
 import asyncio
+import orjson
+
+
+_DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _dumps(obj: Any) -> bytes:
+    """Encode to compact JSON bytes, stringifying values orjson cannot serialize."""
+    return orjson.dumps(obj, default=str, option=_DUMPS_OPTIONS)
 
 
 class StateMonitor:
     """Real-time state monitor for LangGraph workflows."""
     
+    # Minimum seconds between background snapshot writes
+    FLUSH_INTERVAL = 0.1
+    # Pending JSONL bytes that trigger a log write before the next flush
+    LOG_BATCH_BYTES = 64 * 1024
+    # Node name keywords mapped to agents, checked in order
+    _AGENT_KEYWORDS = (("nexus", "NEXUS"), ("reco", "RECO"), ("stat", "STAT"), ("end", "END"))
+    
     def __init__(self, output_file: str = "langgraph_state.json"):
         """Initialize the state monitor."""
         self.output_file = Path(output_file)
+        # Node and error records are appended here one JSON line at a time,
+        # batched in _log_pending so each write is a single syscall; the log
+        # is truncated at the start of each execution, like the state file
+        self.log_file = self.output_file.with_suffix(".jsonl")
+        self._log_fh = open(self.log_file, "ab", buffering=0)
+        self._log_pending = bytearray()
         self.state_history = []
+        # Encoded state_history records, comma-separated, spliced into snapshots as-is
+        self._history_bytes = bytearray()
         self.current_state = None
+        # Timestamp of the latest record, reused as the snapshot's last_updated
+        self._last_updated: Optional[str] = None
         self.execution_metadata = {
             "start_time": None,
             "end_time": None,
@@ -28,6 +54,14 @@ class StateMonitor:
             "error_count": 0
         }
         self.callbacks = []
+        self._agent_cache: Dict[str, str] = {}
+        # Per-agent counts and durations, maintained as nodes are recorded
+        self._agent_stats: Dict[str, Dict[str, Any]] = {}
+        # All file I/O runs in submission order on one writer thread
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-monitor")
+        # Coalesced snapshot writer, started on first record inside an event loop
+        self._dirty_event: Optional[asyncio.Event] = None
+        self._flusher_task: Optional[asyncio.Task] = None
         
     def add_callback(self, callback: Callable[[Dict[str, Any]], None]):
         """Add a callback function to be called on state updates."""
@@ -35,18 +69,35 @@ class StateMonitor:
     
     def start_execution(self, session_id: str, initial_state: Dict[str, Any]):
         """Start monitoring a new execution."""
-        self.execution_metadata["start_time"] = datetime.now().isoformat()
+        timestamp = datetime.now().isoformat()
+        self.execution_metadata["start_time"] = timestamp
         self.execution_metadata["session_id"] = session_id
         self.state_history = []
+        self._history_bytes = bytearray()
+        self._agent_stats = {}
         self.current_state = initial_state
+        self._last_updated = timestamp
         
-        self._save_state()
-        self._notify_callbacks("execution_started")
+        self._log_pending.clear()
+        self._writer.submit(self._truncate_log)
+        self._writer.submit(self._write_payload, self._encode_snapshot())
+        self._notify_callbacks("execution_started", timestamp=timestamp)
     
-    def record_node_execution(self, node_name: str, input_state: Dict[str, Any], 
-                            output_state: Dict[str, Any], duration: float = 0):
-        """Record a node execution."""
+    def record_node_execution(self, node_name: str, input_state: Optional[Dict[str, Any]], 
+                            output_state: Dict[str, Any], duration: float = 0,
+                            duration_ns: Optional[int] = None):
+        """Record a node execution.
+        
+        Pass input_state=None when the input is the previous node's output;
+        the record then omits it rather than storing the same state twice.
+        Durations may be given as integer nanoseconds (duration_ns) for
+        lossless aggregation; duration in seconds is derived from it.
+        """
         timestamp = datetime.now().isoformat()
+        if duration_ns is None:
+            duration_ns = int(duration * 1_000_000_000)
+        else:
+            duration = duration_ns / 1e9
         
         # Determine agent from node name
         agent = self._get_agent_from_node(node_name)
@@ -56,7 +107,7 @@ class StateMonitor:
             "node_name": node_name,
             "agent": agent,
             "duration": duration,
-            "input_state": self._sanitize_state(input_state),
+            "duration_ns": duration_ns,
             "output_state": self._sanitize_state(output_state),
             "turn": output_state.get("current_turn", 0),
             "speaker": output_state.get("current_speaker", "UNKNOWN"),
@@ -66,13 +117,21 @@ class StateMonitor:
                 "script_lines": len(output_state.get("script_lines", []))
             }
         }
+        if input_state is not None:
+            state_record["input_state"] = self._sanitize_state(input_state)
         
         self.state_history.append(state_record)
         self.current_state = output_state
         self.execution_metadata["node_count"] += 1
+        self._last_updated = timestamp
+        
+        stats = self._agent_stats.setdefault(agent, {"count": 0, "total_duration_ns": 0})
+        stats["count"] += 1
+        stats["total_duration_ns"] += duration_ns
         
-        self._save_state()
-        self._notify_callbacks("node_executed", state_record)
+        record_bytes = self._append_event(state_record)
+        self._mark_dirty()
+        self._notify_callbacks("node_executed", state_record, timestamp, record_bytes)
     
     def record_error(self, node_name: str, error: Exception, state: Dict[str, Any]):
         """Record an execution error."""
@@ -88,76 +147,162 @@ class StateMonitor:
         
         self.execution_metadata["error_count"] += 1
         self.state_history.append(error_record)
+        self._last_updated = timestamp
         
-        self._save_state()
-        self._notify_callbacks("error_occurred", error_record)
+        record_bytes = self._append_event(error_record)
+        self._mark_dirty()
+        self._notify_callbacks("error_occurred", error_record, timestamp, record_bytes)
     
     def end_execution(self, final_state: Dict[str, Any]):
         """End the execution monitoring."""
-        self.execution_metadata["end_time"] = datetime.now().isoformat()
+        end = datetime.now()
+        timestamp = end.isoformat()
+        self.execution_metadata["end_time"] = timestamp
         
         if self.execution_metadata["start_time"]:
             start = datetime.fromisoformat(self.execution_metadata["start_time"])
-            end = datetime.fromisoformat(self.execution_metadata["end_time"])
             self.execution_metadata["total_duration"] = (end - start).total_seconds()
         
         self.current_state = final_state
-        self._save_state()
-        self._notify_callbacks("execution_completed")
+        self._last_updated = timestamp
+        self._stop_flusher()
+        # Wait for queued writes so the files are complete when this returns
+        self._submit_log()
+        self._writer.submit(self._write_payload, self._encode_snapshot()).result()
+        self._notify_callbacks("execution_completed", timestamp=timestamp)
+    
+    def close(self):
+        """Flush and close the execution log."""
+        self._stop_flusher()
+        if not self._log_fh.closed:
+            self._submit_log()
+            self._writer.submit(self._log_fh.close)
+        self._writer.shutdown(wait=True)
     
     def _get_agent_from_node(self, node_name: str) -> str:
         """Extract agent name from node name."""
-        node_lower = node_name.lower()
-        if "nexus" in node_lower:
-            return "NEXUS"
-        elif "reco" in node_lower:
-            return "RECO"
-        elif "stat" in node_lower:
-            return "STAT"
-        elif "end" in node_lower:
-            return "END"
-        else:
-            return "UNKNOWN"
+        agent = self._agent_cache.get(node_name)
+        if agent is None:
+            node_lower = node_name.lower()
+            agent = next(
+                (name for keyword, name in self._AGENT_KEYWORDS if keyword in node_lower),
+                "UNKNOWN"
+            )
+            self._agent_cache[node_name] = agent
+        return agent
     
     def _sanitize_state(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Sanitize state for JSON serialization."""
-        sanitized = {}
-        
-        for key, value in state.items():
-            try:
-                # Try to serialize to check if it's JSON-compatible
-                json.dumps(value)
-                sanitized[key] = value
-            except (TypeError, ValueError):
-                # If not serializable, convert to string representation
-                sanitized[key] = str(value)
+        """Copy state for recording; unserializable values are stringified by _dumps."""
+        return dict(state)
+    
+    def _append_event(self, record: Dict[str, Any]) -> Optional[bytes]:
+        """Append one history record to the JSONL execution log and the history buffer.
         
-        return sanitized
+        Returns the record's JSON encoding, or None if it could not be encoded.
+        """
+        try:
+            chunk = _dumps(record)
+            if self._history_bytes:
+                self._history_bytes += b","
+            self._history_bytes += chunk
+        except Exception as e:
+            print(f"Warning: Could not encode record for {self.log_file}: {e}")
+            return None
+        self._log_pending += chunk
+        self._log_pending += b"\n"
+        if len(self._log_pending) >= self.LOG_BATCH_BYTES:
+            self._submit_log()
+        return chunk
     
-    def _save_state(self):
-        """Save current state to file."""
+    def _submit_log(self):
+        """Hand the pending JSONL batch to the writer thread."""
+        if self._log_pending:
+            self._writer.submit(self._write_log, bytes(self._log_pending))
+            self._log_pending.clear()
+    
+    def _truncate_log(self):
+        """Empty the execution log (runs on the writer thread)."""
+        try:
+            self._log_fh.truncate(0)
+        except Exception as e:
+            print(f"Warning: Could not truncate {self.log_file}: {e}")
+    
+    def _write_log(self, data: bytes):
+        """Append encoded lines to the execution log (runs on the writer thread)."""
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self._log_fh.write(view):]
+        except Exception as e:
+            print(f"Warning: Could not append to {self.log_file}: {e}")
+    
+    def _encode_snapshot(self) -> tuple:
+        """Encode metadata, current state and a copy of the history buffer."""
         data = {
             "execution_metadata": self.execution_metadata,
             "current_state": self._sanitize_state(self.current_state) if self.current_state else None,
-            "state_history": self.state_history,
-            "last_updated": datetime.now().isoformat()
+            "last_updated": self._last_updated
         }
-        
+        return _dumps(data), bytes(self._history_bytes)
+    
+    def _write_payload(self, snapshot: tuple):
+        """Write an encoded snapshot to the state file (runs on the writer thread)."""
+        header, history = snapshot
         try:
-            with open(self.output_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with open(self.output_file, 'wb', buffering=1 << 20) as f:
+                f.write(header[:-1])
+                f.write(b',"state_history":[')
+                f.write(history)
+                f.write(b']}')
         except Exception as e:
             print(f"Warning: Could not save state to {self.output_file}: {e}")
     
-    def _notify_callbacks(self, event_type: str, data: Dict[str, Any] = None):
-        """Notify all registered callbacks."""
+    def _mark_dirty(self):
+        """Schedule a coalesced snapshot write when called from inside an event loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._flusher_task is None or self._flusher_task.done():
+            self._dirty_event = asyncio.Event()
+            self._flusher_task = loop.create_task(self._flusher())
+        self._dirty_event.set()
+    
+    async def _flusher(self):
+        """Write at most one snapshot per FLUSH_INTERVAL while records keep arriving."""
+        while True:
+            await self._dirty_event.wait()
+            self._dirty_event.clear()
+            self._submit_log()
+            await asyncio.get_running_loop().run_in_executor(
+                self._writer, self._write_payload, self._encode_snapshot()
+            )
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+    
+    def _stop_flusher(self):
+        """Cancel the snapshot flusher; callers follow up with a final flush."""
+        if self._flusher_task is not None:
+            self._flusher_task.cancel()
+            self._flusher_task = None
+    
+    def _notify_callbacks(self, event_type: str, data: Dict[str, Any] = None,
+                          timestamp: Optional[str] = None, data_bytes: Optional[bytes] = None):
+        """Notify all registered callbacks.
+        
+        Events carry "event_bytes", the JSON encoding of "data" when it has one,
+        so callbacks forwarding JSON (e.g. to a websocket) need not re-encode it.
+        """
+        if not self.callbacks:
+            return
+        event = {
+            "event_type": event_type,
+            "data": data,
+            "event_bytes": data_bytes,
+            "timestamp": timestamp or datetime.now().isoformat()
+        }
         for callback in self.callbacks:
             try:
-                callback({
-                    "event_type": event_type,
-                    "data": data,
-                    "timestamp": datetime.now().isoformat()
-                })
+                callback(event)
             except Exception as e:
                 print(f"Warning: Callback error: {e}")
     
@@ -166,24 +311,6 @@ class StateMonitor:
         if not self.state_history:
             return {"status": "no_execution"}
         
-        # Calculate agent statistics
-        agent_stats = {}
-        total_duration = 0
-        
-        for record in self.state_history:
-            if "error_type" in record:  # Skip error records
-                continue
-                
-            agent = record.get("agent", "UNKNOWN")
-            duration = record.get("duration", 0)
-            
-            if agent not in agent_stats:
-                agent_stats[agent] = {"count": 0, "total_duration": 0}
-            
-            agent_stats[agent]["count"] += 1
-            agent_stats[agent]["total_duration"] += duration
-            total_duration += duration
-        
         # Get current turn info
         current_turn = 0
         max_turns = 0
@@ -202,7 +329,10 @@ class StateMonitor:
             "current_turn": current_turn,
             "max_turns": max_turns,
             "progress": (current_turn / max_turns * 100) if max_turns > 0 else 0,
-            "agent_stats": agent_stats,
+            "agent_stats": {
+                agent: {"count": stats["count"], "total_duration": stats["total_duration_ns"] / 1e9}
+                for agent, stats in self._agent_stats.items()
+            },
             "total_conversation_entries": len(self.current_state.get("conversation_history", [])) if self.current_state else 0
         }
 
@@ -216,10 +346,16 @@ class MonitoredOrchestrator:
         
         self.orchestrator = AgentBasedOrchestrator()
         self.monitor = monitor or StateMonitor()
+    
+    def close(self):
+        """Close the monitor's execution log and writer thread."""
+        self.monitor.close()
         
     async def generate_podcast_with_monitoring(self, context: str, session_id: str = None, 
                                              max_turns: int = 3) -> Dict[str, Any]:
         """Generate podcast with real-time monitoring."""
+        from uap_podcast.models.podcast import ConversationDynamics
+        
         if not session_id:
             session_id = f"monitored_session_{int(time.time())}"
         
@@ -245,6 +381,8 @@ class MonitoredOrchestrator:
         
         # Start monitoring
         self.monitor.start_execution(session_id, initial_state)
+        # The graph's nodes are shared; give this run its own opener history
+        run_token = ConversationDynamics.start_run()
         
         try:
             # Get compiled graph
@@ -252,23 +390,27 @@ class MonitoredOrchestrator:
             
             # Execute with async monitoring
             final_state = None
+            # Only the first node's input is new; later inputs are the previous output
+            input_state = initial_state
+            # A node's duration is the time the graph took to yield its event
+            started_ns = time.perf_counter_ns()
             async for event in graph.astream(initial_state, config={"recursion_limit": 60}):
+                duration_ns = time.perf_counter_ns() - started_ns
                 for node_name, node_output in event.items():
                     # Record node execution
-                    start_time = time.time()
-                    # Simulate some processing time for demonstration
-                    await asyncio.sleep(0.01)
-                    duration = time.time() - start_time
-                    
                     self.monitor.record_node_execution(
                         node_name=node_name,
-                        input_state=initial_state,
+                        input_state=input_state,
                         output_state=node_output,
-                        duration=duration
+                        duration_ns=duration_ns
                     )
                     
                     final_state = node_output
                     initial_state = node_output  # Update for next iteration
+                    input_state = None
+                
+                # Exclude monitoring overhead from the next node's duration
+                started_ns = time.perf_counter_ns()
             
             # End monitoring
             self.monitor.end_execution(final_state or initial_state)
@@ -288,6 +430,8 @@ class MonitoredOrchestrator:
                 "error": str(e),
                 "execution_summary": self.monitor.get_execution_summary()
             }
+        finally:
+            ConversationDynamics.end_run(run_token)
 
 
 def print_status_callback(event: Dict[str, Any]):
@@ -330,11 +474,14 @@ if __name__ == "__main__":
     
     async def run_demo():
         print("Starting monitored podcast generation...")
-        result = await orchestrator.generate_podcast_with_monitoring(
-            context=context,
-            session_id="demo_session",
-            max_turns=2
-        )
+        try:
+            result = await orchestrator.generate_podcast_with_monitoring(
+                context=context,
+                session_id="demo_session",
+                max_turns=2
+            )
+        finally:
+            orchestrator.close()
         
         print("\n📊 Execution Summary:")
         summary = result["execution_summary"]
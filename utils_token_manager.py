@@ -1,4 +1,5 @@
 from dotenv import load_dotenv, set_key
+import asyncio
 import os
 import time
 import httpx
@@ -8,8 +9,12 @@ from .logging import default_logger as logger
 class TokenManager:
     """
     Manages OAuth2 token generation and caching.
-    Tokens are cached in environment variables with expiry handling.
+    Tokens are cached in-process and in environment variables with expiry handling,
+    and written back to the .env file only when TOKEN_PERSIST_TO_ENV=1.
     """
+    # Refresh this many seconds before the cached token expires
+    EXPIRY_MARGIN = 30
+
     def __init__(self, auth_url: str, grant_type: str, scope: str, env_path=".env"):
         self.auth_url           = auth_url
         self.grant_type         = grant_type
@@ -18,26 +23,92 @@ class TokenManager:
         self.token_key          = "AZURE_OPENAI_API_KEY"
         self.env_path           = env_path
 
+        self._cached_token: Optional[str] = None
+        self._cached_expiry: float = 0.0
+        # In-flight refresh shared by concurrent callers
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Pooled client for the auth server, bound to the loop that created it
+        self._http: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Closes of clients left behind by a previous loop
+        self._closing: set[asyncio.Task] = set()
+
         load_dotenv(self.env_path)
+        # Rewriting the .env file on every refresh is opt-in; tokens live in-process by default
+        self._persist_to_env: bool = os.environ.get("TOKEN_PERSIST_TO_ENV") == "1"
+        self._load_cached_token()
 
-    def _is_token_valid(self) -> bool:
+    def _load_cached_token(self):
         token   = os.environ.get(self.token_key)
         expiry  = os.environ.get(self.token_expiry_key)
         if token and expiry:
             try:
-                return time.time() < float(expiry)
+                self._cached_expiry = float(expiry)
+                self._cached_token  = token
             except ValueError:
-                return False
-        return False
+                pass
+
+    def _is_token_valid(self) -> bool:
+        return self._cached_token is not None and time.time() < self._cached_expiry - self.EXPIRY_MARGIN
 
     def _update_env(self, key, value):
-        set_key(self.env_path, key, value)
         os.environ[key] = value
+        if self._persist_to_env:
+            set_key(self.env_path, key, value)
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http_loop is not loop:
+            if self._http is not None:
+                self._close_stale_client(self._http, self._http_loop)
+            self._http = httpx.AsyncClient(
+                timeout=60,
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=4)
+            )
+            self._http_loop = loop
+        return self._http
+
+    def _close_stale_client(self, client: httpx.AsyncClient, client_loop: asyncio.AbstractEventLoop):
+        if client_loop.is_running():
+            # Its loop lives on in another thread; close it there
+            asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+        else:
+            task = asyncio.create_task(self._aclose_quietly(client))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _aclose_quietly(client: httpx.AsyncClient):
+        try:
+            await client.aclose()
+        except Exception as e:
+            # Connections opened on a loop that has since closed may not shut down cleanly
+            logger.debug(f"Could not close stale auth client: {e}")
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self._http_loop = None
+
+    def _clear_refresh_task(self, task: asyncio.Task):
+        if self._refresh_task is task:
+            self._refresh_task = None
 
     async def generate_token(self) -> Optional[str]:
         if self._is_token_valid():
-            return os.environ.get(self.token_key)
+            return self._cached_token
+
+        # Single-flight: concurrent callers await the same refresh
+        task = self._refresh_task
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.create_task(self._refresh_token())
+            task.add_done_callback(self._clear_refresh_task)
+            self._refresh_task = task
+        return await asyncio.shield(task)
 
+    async def _refresh_token(self) -> Optional[str]:
         body = {
             "grant_type": self.grant_type,
             "scope": self.scope,
@@ -47,22 +118,23 @@ class TokenManager:
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
         try:
-            async with httpx.AsyncClient(timeout=60) as client:
-                response = await client.post(self.auth_url, headers=headers, data=body)
-                response.raise_for_status()
-                data = response.json()
-
-                access_token = data.get("access_token")
-                expires_in = data.get("expires_in", 3600)
-
-                if access_token:
-                    expiry_time = str(time.time() + expires_in)
-                    self._update_env(self.token_key, access_token)
-                    self._update_env(self.token_expiry_key, expiry_time)
-                    return access_token
-                else:
-                    logger.error("No access token found in response.")
-                    return None
+            response = await self._client().post(self.auth_url, headers=headers, data=body)
+            response.raise_for_status()
+            data = response.json()
+
+            access_token = data.get("access_token")
+            expires_in = data.get("expires_in", 3600)
+
+            if access_token:
+                expiry_time = time.time() + expires_in
+                self._cached_token  = access_token
+                self._cached_expiry = expiry_time
+                self._update_env(self.token_key, access_token)
+                self._update_env(self.token_expiry_key, str(expiry_time))
+                return access_token
+            else:
+                logger.error("No access token found in response.")
+                return None
         except httpx.HTTPError as e:
             logger.error(f"HTTP error occurred: {e}")
             return None
@@ -87,5 +159,6 @@ if __name__ == "__main__":
             logger.info(f"Generated Token: {token}")
         else:
             logger.error("Failed to generate token.")
+        await token_manager.aclose()
 
     asyncio.run(main())
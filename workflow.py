@@ -2,7 +2,10 @@
 
 import uuid
 import datetime
+import functools
 import json
+import os
+import struct
 import asyncio
 from typing import Dict, Any, Optional, Literal, List
 from pathlib import Path
@@ -10,7 +13,7 @@ from pathlib import Path
 from langgraph.graph import StateGraph, END
 
 from utils.logging import setup_logger
-from models.podcast import PodcastContext
+from models.podcast import PodcastContext, ConversationDynamics
 from agents.nexus_agent.utils.state import PodcastState, NexusAgentState
 from agents.reco_agent.utils.state import RecoAgentState
 from agents.stat_agent.utils.state import StatAgentState
@@ -19,80 +22,93 @@ from agents.reco_agent.utils.nodes import RecoNodes
 from agents.stat_agent.utils.nodes import StatNodes
 
 
-class AgentBasedOrchestrator:
-    """LangGraph-based podcast orchestration using agent structure."""
+# Size of a canonical RIFF/WAVE header (RIFF + 16-byte fmt chunk + data chunk header)
+WAV_HEADER_SIZE = 44
+
+
+@functools.lru_cache(maxsize=1)
+def _build_default_graph(nexus_cls, reco_cls, stat_cls):
+    """Build the node sets and compile the LangGraph workflow once per process.
     
-    def __init__(self):
-        """Initialize the Agent-based Orchestrator."""
-        self.nexus_nodes = NexusNodes()
-        self.reco_nodes = RecoNodes()
-        self.stat_nodes = StatNodes()
-        self.logger = setup_logger("uap_podcast")
-        
-        # Compiled graph cache
-        self._compiled_graph = None
+    Keyed by the node classes so every orchestrator shares one execution plan
+    and one set of node services. Services must not hold per-run or per-loop
+    state: LLM clients come from the per-loop factory cache on each call, and
+    opener history is scoped to a run by ConversationDynamics.start_run.
+    """
+    nexus_nodes = nexus_cls()
+    reco_nodes = reco_cls()
+    stat_nodes = stat_cls()
+    logger = setup_logger("uap_podcast")
     
-    def _build_compiled_graph(self):
-        """Build and compile the LangGraph workflow."""
-        builder = StateGraph(PodcastState)
-        
-        # Add all nodes
-        builder.add_node("nexus_intro", self.nexus_nodes.nexus_intro_node)
-        builder.add_node("reco_intro", self.reco_nodes.reco_intro_node)
-        builder.add_node("stat_intro", self.stat_nodes.stat_intro_node)
-        builder.add_node("nexus_topic_intro", self.nexus_nodes.nexus_topic_intro_node)
-        builder.add_node("reco_turn", self.reco_nodes.reco_turn_node)
-        builder.add_node("stat_turn", self.stat_nodes.stat_turn_node)
-        builder.add_node("nexus_outro", self.nexus_nodes.nexus_outro_node)
+    builder = StateGraph(PodcastState)
+    
+    # Add all nodes
+    builder.add_node("nexus_intro", nexus_nodes.nexus_intro_node)
+    builder.add_node("reco_intro", reco_nodes.reco_intro_node)
+    builder.add_node("stat_intro", stat_nodes.stat_intro_node)
+    builder.add_node("nexus_topic_intro", nexus_nodes.nexus_topic_intro_node)
+    builder.add_node("reco_turn", reco_nodes.reco_turn_node)
+    builder.add_node("stat_turn", stat_nodes.stat_turn_node)
+    builder.add_node("nexus_outro", nexus_nodes.nexus_outro_node)
+    
+    # Define the workflow
+    builder.set_entry_point("nexus_intro")
+    
+    # Linear flow through introductions
+    builder.add_edge("nexus_intro", "reco_intro")
+    builder.add_edge("reco_intro", "stat_intro")
+    builder.add_edge("stat_intro", "nexus_topic_intro")
+    
+    # Main conversation loop
+    builder.add_edge("nexus_topic_intro", "reco_turn")
+    
+    # Conditional logic for conversation flow
+    def should_continue(state: PodcastState) -> Literal["continue_conversation", "end_conversation"]:
+        """Determine whether to continue or end the conversation - FIXED VERSION."""
+        current_turn = float(state["current_turn"])
+        max_turns = float(state["max_turns"])
         
-        # Define the workflow
-        builder.set_entry_point("nexus_intro")
+        # Safety check: Force termination after reasonable limit
+        if current_turn > max_turns + 2:  # Allow 2 extra turns as safety buffer
+            logger.warning(f"⚠️ Force termination: {current_turn} > {max_turns} + safety buffer")
+            return "end_conversation"
         
-        # Linear flow through introductions
-        builder.add_edge("nexus_intro", "reco_intro")
-        builder.add_edge("reco_intro", "stat_intro")
-        builder.add_edge("stat_intro", "nexus_topic_intro")
+        # Normal termination condition with floating point tolerance
+        should_end = current_turn >= max_turns - 0.1
         
-        # Main conversation loop
-        builder.add_edge("nexus_topic_intro", "reco_turn")
+        #logger.info(f"🔄 Turn check: {current_turn}/{max_turns}, should_end: {should_end}")
         
-        # Conditional logic for conversation flow
-        def should_continue(state: PodcastState) -> Literal["continue_conversation", "end_conversation"]:
-            """Determine whether to continue or end the conversation - FIXED VERSION."""
-            current_turn = float(state["current_turn"])
-            max_turns = float(state["max_turns"])
-            
-            # Safety check: Force termination after reasonable limit
-            if current_turn > max_turns + 2:  # Allow 2 extra turns as safety buffer
-                self.logger.warning(f"⚠️ Force termination: {current_turn} > {max_turns} + safety buffer")
-                return "end_conversation"
-            
-            # Normal termination condition with floating point tolerance
-            should_end = current_turn >= max_turns - 0.1
-            
-            #self.logger.info(f"🔄 Turn check: {current_turn}/{max_turns}, should_end: {should_end}")
-            
-            return "end_conversation" if should_end else "continue_conversation"
-        
-        # Add conditional edges with proper routing dictionaries
-        builder.add_conditional_edges("reco_turn", should_continue, {
-            "continue_conversation": "stat_turn",
-            "end_conversation": "nexus_outro"
-        })
-        builder.add_conditional_edges("stat_turn", should_continue, {
-            "continue_conversation": "reco_turn", 
-            "end_conversation": "nexus_outro"
-        })
-        
-        # End workflow
-        builder.add_edge("nexus_outro", END)
+        return "end_conversation" if should_end else "continue_conversation"
+    
+    # Add conditional edges with proper routing dictionaries
+    builder.add_conditional_edges("reco_turn", should_continue, {
+        "continue_conversation": "stat_turn",
+        "end_conversation": "nexus_outro"
+    })
+    builder.add_conditional_edges("stat_turn", should_continue, {
+        "continue_conversation": "reco_turn", 
+        "end_conversation": "nexus_outro"
+    })
+    
+    # End workflow
+    builder.add_edge("nexus_outro", END)
+    
+    return builder.compile(), (nexus_nodes, reco_nodes, stat_nodes)
+
+
+class AgentBasedOrchestrator:
+    """LangGraph-based podcast orchestration using agent structure."""
+    
+    def __init__(self):
+        """Initialize the Agent-based Orchestrator."""
+        self.logger = setup_logger("uap_podcast")
         
-        return builder.compile()
+        # Shared per process so every orchestrator reuses the same execution plan
+        self._compiled_graph, nodes = _build_default_graph(NexusNodes, RecoNodes, StatNodes)
+        self.nexus_nodes, self.reco_nodes, self.stat_nodes = nodes
     
     def get_compiled_graph(self):
-        """Get or build the compiled graph."""
-        if self._compiled_graph is None:
-            self._compiled_graph = self._build_compiled_graph()
+        """Get the compiled graph."""
         return self._compiled_graph
     
     def _determine_conversation_flow(self, state: PodcastState) -> str:
@@ -130,6 +146,8 @@ class AgentBasedOrchestrator:
         recursion_limit: int = 60
     ) -> Dict[str, Any]:
         """Generate a podcast using LangGraph workflow."""
+        # Nodes are shared across orchestrators; keep this run's opener history to itself
+        run_token = ConversationDynamics.start_run()
         try:
             self.logger.info("Starting LangGraph-based podcast generation")
             
@@ -138,13 +156,13 @@ class AgentBasedOrchestrator:
                 session_id = f"session_{uuid.uuid4().hex[:8]}"
             
             # Setup context
-            context = PodcastContext.load_from_files(file_choice)
+            context = PodcastContext.load_cached(file_choice)
             
             # Create initial state
             context_dict = {
                 "content": context.content, 
                 "metadata": context.metadata,
-                "summary": context.content[:500] + "..." if len(context.content) > 500 else context.content
+                "summary": context.summary
             }
             
             initial_state = PodcastState(
@@ -201,7 +219,10 @@ class AgentBasedOrchestrator:
             script_file = self._save_script(final_state)
             
             # Calculate duration
-            duration = self._calculate_duration(final_state.get('audio_segments', []))
+            duration = await asyncio.to_thread(
+                self._calculate_duration,
+                final_state.get('audio_segments', [])
+            )
             
             result = {
                 "session_id": session_id,
@@ -221,6 +242,8 @@ class AgentBasedOrchestrator:
         except Exception as e:
             self.logger.error(f"❌ Agent-based LangGraph generation failed: {str(e)}")
             raise e
+        finally:
+            ConversationDynamics.end_run(run_token)
     
     async def _finalize_audio(self, state: Dict[str, Any]) -> str:
         """Create final audio file from segments."""
@@ -260,18 +283,34 @@ class AgentBasedOrchestrator:
     def _calculate_duration(self, audio_segments: List[str]) -> float:
         """Calculate total duration from audio segments."""
         try:
-            import wave
             total_duration = 0.0
             
             for segment_path in audio_segments:
                 if Path(segment_path).exists():
-                    with wave.open(segment_path, 'rb') as wav_file:
-                        frames = wav_file.getnframes()
-                        sample_rate = wav_file.getframerate()
-                        duration = frames / float(sample_rate)
-                        total_duration += duration
+                    total_duration += self._segment_duration(segment_path)
             
             return total_duration
         except Exception as e:
             self.logger.warning(f"Could not calculate duration: {e}")
             return 0.0
+    
+    @staticmethod
+    def _segment_duration(segment_path: str) -> float:
+        """Duration of one WAV file from its 44-byte canonical header."""
+        with open(segment_path, 'rb') as f:
+            header = f.read(WAV_HEADER_SIZE)
+            data_size = os.fstat(f.fileno()).st_size - WAV_HEADER_SIZE
+        
+        if (
+            len(header) == WAV_HEADER_SIZE
+            and header[0:4] == b"RIFF" and header[8:12] == b"WAVE"
+            and header[12:16] == b"fmt " and header[36:40] == b"data"
+        ):
+            byte_rate = struct.unpack_from("<I", header, 28)[0]
+            if byte_rate:
+                return data_size / byte_rate
+        
+        # Non-canonical layout (extra chunks, extensible fmt): let wave walk the chunks
+        import wave
+        with wave.open(segment_path, 'rb') as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())